@@ -1,6 +1,9 @@
 from stimpl.errors import *
 from stimpl.expression import *
 from stimpl.runtime import *
+from stimpl.compile import *
+from stimpl.closures import *
+from stimpl.resolve import *
 from stimpl.robustness import *
 from stimpl.test import *
 from stimpl.types import *
\ No newline at end of file
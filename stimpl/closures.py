@@ -0,0 +1,376 @@
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.runtime import State, MutableState
+
+"""
+Direct-threaded interpreter.
+
+compile_to_closure walks the AST exactly once and builds a closure per
+node, each a fn(state) -> (value, type, state). Running the program is
+then plain Python calls with no per-visit dispatch or attribute access
+at all -- the operands, handlers, and error messages a node needs are
+captured in its closure's cells. Semantics (type checks, error types and
+messages, And's short-circuit, While's loop-state handling) match the
+tree-walking evaluator.
+"""
+
+
+def _build_ren(expression):
+    def run(state):
+        return (None, UNIT, state)
+    return run
+
+
+def _build_literal(expression):
+    literal = expression.literal
+    if type(expression) is IntLiteral:
+        literal_type = INTEGER
+    elif type(expression) is FloatingPointLiteral:
+        literal_type = FLOATING_POINT
+    elif type(expression) is StringLiteral:
+        literal_type = STRING
+    else:
+        literal_type = BOOLEAN
+
+    def run(state):
+        return (literal, literal_type, state)
+    return run
+
+
+def _build_variable(expression):
+    variable_name = expression.variable_name
+
+    def run(state):
+        binding = state._vars.get(variable_name)
+        if binding is None:
+            raise InterpSyntaxError(
+                f"Cannot read from {variable_name} before assignment.")
+        return (binding[0], binding[1], state)
+    return run
+
+
+def _build_assign(expression):
+    variable_name = expression.variable.variable_name
+    value_closure = compile_to_closure(expression.value)
+
+    def run(state):
+        value_result, value_type, new_state = value_closure(state)
+        binding = new_state.get_value(variable_name)
+        if binding is not None:
+            variable_type = binding[1]
+            if variable_type is not None and variable_type is not value_type:
+                raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {value_type} to {variable_type}""")
+        new_state = new_state.set_value(
+            variable_name, value_result, value_type)
+        return (value_result, value_type, new_state)
+    return run
+
+
+def _build_print(expression):
+    operand_closure = compile_to_closure(expression.to_print)
+
+    def run(state):
+        printable_value, printable_type, new_state = operand_closure(state)
+        if printable_type is UNIT:
+            print("Unit")
+        else:
+            print(f"{printable_value}")
+        return (printable_value, printable_type, new_state)
+    return run
+
+
+def _build_sequence(expression):
+    closures = [compile_to_closure(expr) for expr in expression.exprs]
+    if not closures:
+        def run_empty(state):
+            return (None, UNIT, state)
+        return run_empty
+
+    def run(state):
+        for closure in closures:
+            last_value, last_type, state = closure(state)
+        return (last_value, last_type, state)
+    return run
+
+
+def _build_add(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_result, left_type, new_state = left_closure(state)
+        right_result, right_type, new_state = right_closure(new_state)
+        if left_type is not right_type:
+            raise InterpTypeError(f"""Mismatched types for Add:
+            Cannot add {left_type} to {right_type}""")
+        if left_type is None or not left_type.IS_ADDABLE:
+            raise InterpTypeError(f"""Cannot add {left_type}s""")
+        return (left_result + right_result, left_type, new_state)
+    return run
+
+
+def _build_subtract(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, final_state = right_closure(new_state)
+        if left_type is not right_type:
+            raise InterpTypeError(f"""Mismatched types for Subtract:
+            Cannot subtract {right_type} from {left_type}""")
+        if left_type is None or not left_type.IS_NUMERIC:
+            raise InterpTypeError(
+                "Subtraction requires operands of numeric types.")
+        return (left_value - right_value, left_type, final_state)
+    return run
+
+
+def _build_multiply(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, final_state = right_closure(new_state)
+        if left_type is not right_type:
+            raise InterpTypeError(f"""Mismatched types for Multiply:
+            Cannot multiply {left_type} by {right_type}""")
+        if left_type is None or not left_type.IS_NUMERIC:
+            raise InterpTypeError(
+                "Multiplication requires operands of numeric types.")
+        return (left_value * right_value, left_type, final_state)
+    return run
+
+
+def _build_divide(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, final_state = right_closure(new_state)
+        if left_type is not right_type:
+            raise InterpTypeError(f"""Mismatched types for Divide:
+            Cannot divide {left_type} by {right_type}""")
+        if left_type is None or not left_type.IS_NUMERIC:
+            raise InterpTypeError("Division requires numeric types.")
+        if right_value == 0:
+            raise InterpMathError("Division by zero error.")
+        if left_type is INTEGER:
+            return (left_value // right_value, left_type, final_state)
+        return (left_value / right_value, left_type, final_state)
+    return run
+
+
+def _build_and(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        if left_type is not BOOLEAN:
+            raise InterpTypeError(
+                "Cannot perform logical and on non-boolean operands.")
+        if left_value is False:
+            return (False, BOOLEAN, new_state)
+        right_value, right_type, new_state = right_closure(new_state)
+        if right_type is not BOOLEAN:
+            raise InterpTypeError(f"""Mismatched types for And:
+            Cannot evaluate {left_type} and {right_type}""")
+        return (right_value, BOOLEAN, new_state)
+    return run
+
+
+def _build_or(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, new_state = right_closure(new_state)
+        if left_type is not BOOLEAN or right_type is not BOOLEAN:
+            raise InterpTypeError("Or operation requires boolean operands.")
+        return (left_value or right_value, BOOLEAN, new_state)
+    return run
+
+
+def _build_not(expression):
+    operand_closure = compile_to_closure(expression.expr)
+
+    def run(state):
+        operand_value, operand_type, new_state = operand_closure(state)
+        if operand_type is not BOOLEAN:
+            raise InterpTypeError("Logical NOT requires a boolean type.")
+        return (not operand_value, BOOLEAN, new_state)
+    return run
+
+
+def _build_if(expression):
+    condition_closure = compile_to_closure(expression.condition)
+    true_closure = compile_to_closure(expression.true)
+    false_closure = compile_to_closure(expression.false)
+
+    def run(state):
+        condition_value, condition_type, new_state = condition_closure(state)
+        if condition_type is not BOOLEAN:
+            raise InterpTypeError("Condition in If expression must be boolean")
+        if condition_value:
+            return true_closure(new_state)
+        return false_closure(new_state)
+    return run
+
+
+def _build_lt(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, new_state = right_closure(new_state)
+        if left_type is not right_type:
+            raise InterpTypeError(f"""Mismatched types for Lt:
+            Cannot compare {left_type} and {right_type}""")
+        if left_type is not None and left_type.IS_ORDERED:
+            result = left_value < right_value
+        elif left_type is UNIT:
+            result = False
+        else:
+            raise InterpTypeError(
+                f"Cannot perform < on {left_type} type.")
+        return (result, BOOLEAN, new_state)
+    return run
+
+
+def _build_lte(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, new_state = right_closure(new_state)
+        if left_value is None:
+            result = True
+        elif right_value is None:
+            result = False
+        else:
+            result = left_value <= right_value
+        return (result, BOOLEAN, new_state)
+    return run
+
+
+def _build_gt(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, new_state = right_closure(new_state)
+        if isinstance(left_value, (int, float, str)) \
+                and isinstance(right_value, (int, float, str)):
+            result = left_value > right_value
+        elif left_value is None or right_value is None:
+            result = False if left_value is None else True
+        else:
+            raise InterpTypeError("Gt operation cannot compare these types.")
+        return (result, BOOLEAN, new_state)
+    return run
+
+
+def _build_gte(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, new_state = right_closure(new_state)
+        if isinstance(left_value, (int, float, str)) \
+                and isinstance(right_value, (int, float, str)):
+            result = left_value >= right_value
+        elif left_value is None or right_value is None:
+            result = True if left_value is None and right_value is None \
+                else False if left_value is None else True
+        else:
+            raise InterpTypeError("Gte operation cannot compare these types.")
+        return (result, BOOLEAN, new_state)
+    return run
+
+
+def _build_eq(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, new_state = right_closure(new_state)
+        return (left_value == right_value, BOOLEAN, new_state)
+    return run
+
+
+def _build_ne(expression):
+    left_closure = compile_to_closure(expression.left)
+    right_closure = compile_to_closure(expression.right)
+
+    def run(state):
+        left_value, left_type, new_state = left_closure(state)
+        right_value, right_type, new_state = right_closure(new_state)
+        return (left_value != right_value, BOOLEAN, new_state)
+    return run
+
+
+def _build_while(expression):
+    condition_closure = compile_to_closure(expression.condition)
+    body_closure = compile_to_closure(expression.body)
+
+    def run(state):
+        result, result_type = None, None
+        loop_state = MutableState(dict(state._vars))
+        while True:
+            condition_value, condition_type, loop_state = condition_closure(
+                loop_state)
+            if condition_type is not BOOLEAN:
+                raise InterpTypeError("Condition in While loop must be boolean")
+            if not condition_value:
+                break
+            result, result_type, loop_state = body_closure(loop_state)
+        return (result, result_type, State(loop_state._vars))
+    return run
+
+
+_BUILDERS = {
+    Ren: _build_ren,
+    IntLiteral: _build_literal,
+    FloatingPointLiteral: _build_literal,
+    StringLiteral: _build_literal,
+    BooleanLiteral: _build_literal,
+    Variable: _build_variable,
+    Assign: _build_assign,
+    Print: _build_print,
+    Sequence: _build_sequence,
+    Program: _build_sequence,
+    Add: _build_add,
+    Subtract: _build_subtract,
+    Multiply: _build_multiply,
+    Divide: _build_divide,
+    And: _build_and,
+    Or: _build_or,
+    Not: _build_not,
+    If: _build_if,
+    Lt: _build_lt,
+    Lte: _build_lte,
+    Gt: _build_gt,
+    Gte: _build_gte,
+    Eq: _build_eq,
+    Ne: _build_ne,
+    While: _build_while,
+}
+
+
+def compile_to_closure(expression):
+    """ Build the fn(state) -> (value, type, state) closure for a tree. """
+    builder = _BUILDERS.get(type(expression))
+    if builder is None:
+        raise InterpSyntaxError("Unhandled!")
+    return builder(expression)
@@ -0,0 +1,1081 @@
+import operator
+
+from array import array
+
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.runtime import State, EmptyState, _expression_children, \
+    _FusedAssign
+from stimpl.resolve import build_slot_map
+
+"""
+Bytecode compiler and virtual machine.
+
+Tree-walking `evaluate` pays a Python call plus a dispatch for every AST
+node on every visit. `compile_to_bytecode` lowers an expression tree once
+into a flat opcode array and `run_bytecode` executes it with a single tight
+loop over that array and a list used as the operand stack, so re-visited
+code (While bodies especially) costs no per-node dispatch. Semantics --
+type checks, error types and messages, assignment type fixity -- match the
+tree-walking evaluator.
+"""
+
+try:
+    import numpy as _numpy
+    from numba import njit as _njit
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+# Marks a variable slot with no binding yet; None itself is a legal
+# stored value (and, for a never-entered While result, a legal type).
+_UNSET = object()
+
+LOAD_CONST = 0
+LOAD_VAR = 1
+STORE_VAR = 2
+POP = 3
+ADD = 4
+SUBTRACT = 5
+MULTIPLY = 6
+DIVIDE = 7
+AND_CHECK = 8
+OR = 9
+NOT = 10
+COMPARE = 11
+PRINT = 17
+JUMP = 18
+JUMP_IF_FALSE = 19
+AND_JUMP_IF_FALSE = 20
+ADD_INT = 21
+SUBTRACT_INT = 22
+MULTIPLY_INT = 23
+DIVIDE_INT = 24
+LT_INT = 25
+HALT = 26
+
+# COMPARE's argument selects the comparison; _CMP_OPS is indexed by it,
+# so the common (non-Unit) case is one table load instead of six opcode
+# branches.
+CMP_LT = 0
+CMP_LTE = 1
+CMP_GT = 2
+CMP_GTE = 3
+CMP_EQ = 4
+CMP_NE = 5
+
+_CMP_OPS = (operator.lt, operator.le, operator.gt,
+            operator.ge, operator.eq, operator.ne)
+
+
+class Bytecode(object):
+    def __init__(self, code, consts, names, var_types=None, expression=None):
+        self.code = array('i', code)
+        self.consts = consts
+        self.names = names
+        # Parallel const tables so the VM never builds (value, type)
+        # tuples on its operand stack.
+        self.const_values = [value for value, _ in consts]
+        self.const_types = [value_type for _, value_type in consts]
+        # Statically inferred type per variable slot (None = unknown),
+        # recorded so run_bytecode can detect caller-seeded bindings that
+        # contradict the types the specialized opcodes were compiled for.
+        self.var_types = var_types if var_types is not None             else [None] * len(names)
+        self._expression = expression
+        self._numeric = None
+        self._generic = None
+
+    def generic(self):
+        """ The same program compiled without type specialization. """
+        if self._generic is None:
+            slot_map = {name: index for index, name in enumerate(self.names)}
+            compiler = _Compiler(slot_map)
+            compiler.compile(self._expression)
+            compiler.emit(HALT)
+            self._generic = Bytecode(
+                compiler.code, compiler.consts, compiler.names)
+        return self._generic
+
+    def __repr__(self):
+        return f"Bytecode({len(self.code) // 2} instructions, " \
+               f"{len(self.consts)} consts, {len(self.names)} names)"
+
+
+class _Compiler(object):
+    def __init__(self, slot_map=None, node_types=None):
+        self.node_types = {} if node_types is None else node_types
+        self.code = []
+        self.consts = []
+        self._const_indices = {}
+        self._name_indices = {} if slot_map is None else slot_map
+        self.names = [name for name, _ in
+                      sorted(self._name_indices.items(), key=lambda kv: kv[1])]
+
+    def emit(self, opcode, arg=0):
+        self.code.append(opcode)
+        self.code.append(arg)
+
+    def here(self):
+        return len(self.code)
+
+    def emit_jump(self, opcode):
+        """ Emit a jump with a placeholder target; returns the patch site. """
+        self.emit(opcode, -1)
+        return len(self.code) - 1
+
+    def patch_jump(self, patch_site, target=None):
+        self.code[patch_site] = self.here() if target is None else target
+
+    def const_index(self, value, value_type):
+        key = (value, value.__class__, value_type.__class__ if value_type else None)
+        index = self._const_indices.get(key)
+        if index is None:
+            index = len(self.consts)
+            self.consts.append((value, value_type))
+            self._const_indices[key] = index
+        return index
+
+    def name_index(self, variable_name):
+        index = self._name_indices.get(variable_name)
+        if index is None:
+            index = len(self.names)
+            self.names.append(variable_name)
+            self._name_indices[variable_name] = index
+        return index
+
+    def compile(self, expression):
+        """ Compile with an explicit work stack instead of recursion, so
+        arbitrarily deep expression trees (long Add chains, nested
+        Sequences) never hit Python's recursion limit. Work items are
+        either expressions to compile or zero-argument emission tasks
+        scheduled to run between a node's children. """
+        work = [expression]
+        while work:
+            item = work.pop()
+            if isinstance(item, Expr):
+                compiler_for = _COMPILERS.get(type(item))
+                if compiler_for is None:
+                    raise InterpSyntaxError("Unhandled!")
+                compiler_for(self, item, work)
+            else:
+                item()
+
+
+def _compile_ren(compiler, expression, work):
+    compiler.emit(LOAD_CONST, compiler.const_index(None, UNIT))
+
+
+def _compile_int_literal(compiler, expression, work):
+    compiler.emit(LOAD_CONST, compiler.const_index(expression.literal, INTEGER))
+
+
+def _compile_floating_point_literal(compiler, expression, work):
+    compiler.emit(LOAD_CONST,
+                  compiler.const_index(expression.literal, FLOATING_POINT))
+
+
+def _compile_string_literal(compiler, expression, work):
+    compiler.emit(LOAD_CONST, compiler.const_index(expression.literal, STRING))
+
+
+def _compile_boolean_literal(compiler, expression, work):
+    compiler.emit(LOAD_CONST, compiler.const_index(expression.literal, BOOLEAN))
+
+
+def _compile_variable(compiler, expression, work):
+    compiler.emit(LOAD_VAR, compiler.name_index(expression.variable_name))
+
+
+def _compile_assign(compiler, expression, work):
+    def emit_store():
+        compiler.emit(STORE_VAR,
+                      compiler.name_index(expression.variable.variable_name))
+    work.append(emit_store)
+    work.append(expression.value)
+
+
+def _compile_print(compiler, expression, work):
+    def emit_print():
+        compiler.emit(PRINT)
+    work.append(emit_print)
+    work.append(expression.to_print)
+
+
+def _compile_sequence(compiler, expression, work):
+    exprs = expression.exprs
+    if not exprs:
+        compiler.emit(LOAD_CONST, compiler.const_index(None, UNIT))
+        return
+
+    def emit_pop():
+        compiler.emit(POP)
+
+    items = [exprs[0]]
+    for expr in exprs[1:]:
+        items.append(emit_pop)
+        items.append(expr)
+    work.extend(reversed(items))
+
+
+def _compile_fused_assign(compiler, expression, work):
+    # The tree walker's lowering pass fuses runs of pure-valued Assigns
+    # into one internal node; compile it as the run it stands for, whose
+    # value is the last assignment's value.
+    assigns = expression.assigns
+
+    def emit_pop():
+        compiler.emit(POP)
+
+    items = [assigns[0]]
+    for assign in assigns[1:]:
+        items.append(emit_pop)
+        items.append(assign)
+    work.extend(reversed(items))
+
+
+def _compile_not(compiler, expression, work):
+    def emit_not():
+        compiler.emit(NOT)
+    work.append(emit_not)
+    work.append(expression.expr)
+
+
+def _compile_if(compiler, expression, work):
+    sites = {}
+
+    def after_condition():
+        sites["false"] = compiler.emit_jump(JUMP_IF_FALSE)
+
+    def after_true():
+        sites["end"] = compiler.emit_jump(JUMP)
+        compiler.patch_jump(sites["false"])
+
+    def after_false():
+        compiler.patch_jump(sites["end"])
+
+    work.extend((after_false, expression.false, after_true,
+                 expression.true, after_condition, expression.condition))
+
+
+def _compile_while(compiler, expression, work):
+    # A While that never runs its body has value (None, None); seed the
+    # stack with that and let each body pass replace it.
+    compiler.emit(LOAD_CONST, compiler.const_index(None, None))
+    top = compiler.here()
+    sites = {}
+
+    def after_condition():
+        sites["end"] = compiler.emit_jump(JUMP_IF_FALSE)
+        compiler.emit(POP)
+
+    def after_body():
+        compiler.emit(JUMP, top)
+        compiler.patch_jump(sites["end"])
+
+    work.extend((after_body, expression.body,
+                 after_condition, expression.condition))
+
+
+def _compile_and(compiler, expression, work):
+    # And short-circuits: a false left side jumps past the right side,
+    # keeping False on the stack as the result.
+    sites = {}
+
+    def after_left():
+        sites["end"] = compiler.emit_jump(AND_JUMP_IF_FALSE)
+
+    def after_right():
+        compiler.emit(AND_CHECK)
+        compiler.patch_jump(sites["end"])
+
+    work.extend((after_right, expression.right,
+                 after_left, expression.left))
+
+
+# (opcode, arg) pairs with an all-Integer specialization that skips
+# runtime checks.
+_INT_SPECIALIZATIONS = {
+    (ADD, 0): ADD_INT,
+    (SUBTRACT, 0): SUBTRACT_INT,
+    (MULTIPLY, 0): MULTIPLY_INT,
+    (DIVIDE, 0): DIVIDE_INT,
+    (COMPARE, CMP_LT): LT_INT,
+}
+
+
+def _binary_compiler(opcode, arg=0):
+    specialized = _INT_SPECIALIZATIONS.get((opcode, arg))
+
+    def compile_binary(compiler, expression, work):
+        def emit_op():
+            node_types = compiler.node_types
+            if specialized is not None \
+                    and node_types.get(id(expression.left)) is INTEGER \
+                    and node_types.get(id(expression.right)) is INTEGER:
+                compiler.emit(specialized)
+            else:
+                compiler.emit(opcode, arg)
+        work.extend((emit_op, expression.right, expression.left))
+    return compile_binary
+
+
+_COMPILERS = {
+    Ren: _compile_ren,
+    IntLiteral: _compile_int_literal,
+    FloatingPointLiteral: _compile_floating_point_literal,
+    StringLiteral: _compile_string_literal,
+    BooleanLiteral: _compile_boolean_literal,
+    Variable: _compile_variable,
+    Assign: _compile_assign,
+    _FusedAssign: _compile_fused_assign,
+    Print: _compile_print,
+    Sequence: _compile_sequence,
+    Program: _compile_sequence,
+    Not: _compile_not,
+    If: _compile_if,
+    While: _compile_while,
+    Add: _binary_compiler(ADD),
+    Subtract: _binary_compiler(SUBTRACT),
+    Multiply: _binary_compiler(MULTIPLY),
+    Divide: _binary_compiler(DIVIDE),
+    And: _compile_and,
+    Or: _binary_compiler(OR),
+    Lt: _binary_compiler(COMPARE, CMP_LT),
+    Lte: _binary_compiler(COMPARE, CMP_LTE),
+    Gt: _binary_compiler(COMPARE, CMP_GT),
+    Gte: _binary_compiler(COMPARE, CMP_GTE),
+    Eq: _binary_compiler(COMPARE, CMP_EQ),
+    Ne: _binary_compiler(COMPARE, CMP_NE),
+}
+
+
+# Lattice bottom for type inference: "no assignment seen yet", as opposed
+# to None, which means "statically unknown".
+_BOTTOM = object()
+
+_COMPARISON_TYPES = (And, Or, Not, Lt, Lte, Gt, Gte, Eq, Ne)
+_ARITHMETIC_VALID = {
+    Add: (INTEGER, FLOATING_POINT, STRING),
+    Subtract: (INTEGER, FLOATING_POINT),
+    Multiply: (INTEGER, FLOATING_POINT),
+    Divide: (INTEGER, FLOATING_POINT),
+}
+
+
+def _join(left_type, right_type):
+    if left_type is _BOTTOM:
+        return right_type
+    if right_type is _BOTTOM:
+        return left_type
+    return left_type if left_type is right_type else None
+
+
+def _node_static_type(node, node_types, var_types):
+    """ The statically known result type of `node`, None when unknown. """
+    node_type = type(node)
+    if node_type is IntLiteral:
+        return INTEGER
+    if node_type is FloatingPointLiteral:
+        return FLOATING_POINT
+    if node_type is StringLiteral:
+        return STRING
+    if node_type is BooleanLiteral:
+        return BOOLEAN
+    if node_type is Ren:
+        return UNIT
+    if node_type is Variable:
+        return var_types.get(node.variable_name)
+    if isinstance(node, _COMPARISON_TYPES):
+        return BOOLEAN
+    valid = _ARITHMETIC_VALID.get(node_type)
+    if valid is not None:
+        left = node_types.get(id(node.left))
+        right = node_types.get(id(node.right))
+        if left is _BOTTOM or right is _BOTTOM:
+            return _BOTTOM
+        return left if left is right and left in valid else None
+    if node_type is Assign:
+        return node_types.get(id(node.value))
+    if node_type is Print:
+        return node_types.get(id(node.to_print))
+    if node_type is Sequence or node_type is Program:
+        exprs = node.exprs
+        return node_types.get(id(exprs[-1])) if exprs else UNIT
+    if node_type is If:
+        return _join(node_types.get(id(node.true)),
+                     node_types.get(id(node.false)))
+    # While (result may be the (None, None) placeholder) and anything
+    # unrecognized: statically unknown.
+    return None
+
+
+def _static_types(expression):
+    """ Flow-insensitive type inference over the whole program.
+
+    Returns (node_types, var_types): node_types maps id(node) to the
+    node's statically known result type (None = unknown), var_types maps
+    each assigned variable name the same way. A variable's type is known
+    only when every assignment to it agrees; starting every variable at
+    bottom and iterating to a fixpoint lets self-referencing assignments
+    like i = i + 1 resolve against an i = 0 elsewhere in the program. """
+    order = []
+    work = [expression]
+    while work:
+        node = work.pop()
+        order.append(node)
+        work.extend(_expression_children(node))
+    order.reverse()
+
+    assigns = [node for node in order if isinstance(node, Assign)]
+    var_types = {assign.variable.variable_name: _BOTTOM
+                 for assign in assigns}
+    node_types = {}
+    for _ in range(len(var_types) + 2):
+        for node in order:
+            node_types[id(node)] = _node_static_type(
+                node, node_types, var_types)
+        new_var_types = {name: _BOTTOM for name in var_types}
+        for assign in assigns:
+            name = assign.variable.variable_name
+            new_var_types[name] = _join(new_var_types[name],
+                                        node_types[id(assign.value)])
+        if new_var_types == var_types:
+            break
+        var_types = new_var_types
+
+    var_types = {name: None if value_type is _BOTTOM else value_type
+                 for name, value_type in var_types.items()}
+    for node in order:
+        if node_types[id(node)] is _BOTTOM:
+            node_types[id(node)] = None
+    return node_types, var_types
+
+
+def compile_to_bytecode(expression):
+    node_types, var_types = _static_types(expression)
+    compiler = _Compiler(build_slot_map(expression), node_types)
+    compiler.compile(expression)
+    compiler.emit(HALT)
+    return Bytecode(compiler.code, compiler.consts, compiler.names,
+                    [var_types.get(name) for name in compiler.names],
+                    expression)
+
+
+"""
+Numeric fast path.
+
+A program whose constants are all integers or booleans (plus the While
+result placeholder) and which never prints works entirely on machine-word
+values, so its bytecode can run in a kernel that keeps parallel
+value/tag arrays instead of Python tuples. When numba is installed the
+kernel is additionally @njit-compiled over int64 arrays, collapsing a
+counting While loop to a handful of machine instructions; without numba
+the same kernel runs as plain Python and still skips all per-op tuple
+allocation. The int64 JIT path is only taken when the inputs are small
+enough that arithmetic plausibly stays inside 64 bits, and every
+arithmetic op carries a wrap check so an overflowing run is redone with
+exact Python integers instead of returning a silently wrapped result.
+"""
+
+_TAG_UNSET = -1
+_TAG_INT = 0
+_TAG_BOOL = 1
+_TAG_NONE = 2
+
+_STATUS_OK = 0
+_STATUS_TYPE_ERROR = 1
+_STATUS_MATH_ERROR = 2
+_STATUS_UNASSIGNED = 3
+_STATUS_ASSIGN_MISMATCH = 4
+_STATUS_OVERFLOW = 5
+
+_INT64_MIN = -(2 ** 63)
+
+_INT64_INPUT_LIMIT = 2 ** 31
+
+
+def _numeric_kernel(code, const_values, const_tags,
+                    var_values, var_tags, stack_values, stack_tags):
+    pc = 0
+    sp = 0
+    while True:
+        opcode = code[pc]
+        arg = code[pc + 1]
+        pc += 2
+
+        if opcode == HALT:
+            return (_STATUS_OK, 0, sp)
+
+        elif opcode == LOAD_CONST:
+            stack_values[sp] = const_values[arg]
+            stack_tags[sp] = const_tags[arg]
+            sp += 1
+
+        elif opcode == LOAD_VAR:
+            if var_tags[arg] == _TAG_UNSET:
+                return (_STATUS_UNASSIGNED, arg, sp)
+            stack_values[sp] = var_values[arg]
+            stack_tags[sp] = var_tags[arg]
+            sp += 1
+
+        elif opcode == STORE_VAR:
+            tag = stack_tags[sp - 1]
+            if var_tags[arg] != _TAG_UNSET and var_tags[arg] != _TAG_NONE \
+                    and var_tags[arg] != tag:
+                return (_STATUS_ASSIGN_MISMATCH, arg, sp)
+            var_values[arg] = stack_values[sp - 1]
+            var_tags[arg] = tag
+
+        elif opcode == POP:
+            sp -= 1
+
+        elif opcode == ADD or opcode == SUBTRACT \
+                or opcode == MULTIPLY or opcode == DIVIDE:
+            sp -= 1
+            right_value = stack_values[sp]
+            left_value = stack_values[sp - 1]
+            if stack_tags[sp] != _TAG_INT or stack_tags[sp - 1] != _TAG_INT:
+                return (_STATUS_TYPE_ERROR, 0, sp)
+            # The wrap checks below are never true for exact (Python int)
+            # arithmetic, so the plain-Python run of this kernel is
+            # unaffected; under the int64 JIT they catch a wrapped
+            # intermediate so the caller can redo the run exactly.
+            if opcode == ADD:
+                result = left_value + right_value
+                if (right_value > 0 and result < left_value) \
+                        or (right_value < 0 and result > left_value):
+                    return (_STATUS_OVERFLOW, 0, sp)
+                stack_values[sp - 1] = result
+            elif opcode == SUBTRACT:
+                result = left_value - right_value
+                if (right_value < 0 and result < left_value) \
+                        or (right_value > 0 and result > left_value):
+                    return (_STATUS_OVERFLOW, 0, sp)
+                stack_values[sp - 1] = result
+            elif opcode == MULTIPLY:
+                result = left_value * right_value
+                if left_value != 0 and result // left_value != right_value:
+                    return (_STATUS_OVERFLOW, 0, sp)
+                stack_values[sp - 1] = result
+            else:
+                if right_value == 0:
+                    return (_STATUS_MATH_ERROR, 0, sp)
+                if right_value == -1 and left_value == _INT64_MIN:
+                    return (_STATUS_OVERFLOW, 0, sp)
+                stack_values[sp - 1] = left_value // right_value
+
+        elif opcode == ADD_INT or opcode == SUBTRACT_INT \
+                or opcode == MULTIPLY_INT or opcode == DIVIDE_INT:
+            sp -= 1
+            right_value = stack_values[sp]
+            left_value = stack_values[sp - 1]
+            if opcode == ADD_INT:
+                result = left_value + right_value
+                if (right_value > 0 and result < left_value) \
+                        or (right_value < 0 and result > left_value):
+                    return (_STATUS_OVERFLOW, 0, sp)
+                stack_values[sp - 1] = result
+            elif opcode == SUBTRACT_INT:
+                result = left_value - right_value
+                if (right_value < 0 and result < left_value) \
+                        or (right_value > 0 and result > left_value):
+                    return (_STATUS_OVERFLOW, 0, sp)
+                stack_values[sp - 1] = result
+            elif opcode == MULTIPLY_INT:
+                result = left_value * right_value
+                if left_value != 0 and result // left_value != right_value:
+                    return (_STATUS_OVERFLOW, 0, sp)
+                stack_values[sp - 1] = result
+            else:
+                if right_value == 0:
+                    return (_STATUS_MATH_ERROR, 0, sp)
+                if right_value == -1 and left_value == _INT64_MIN:
+                    return (_STATUS_OVERFLOW, 0, sp)
+                stack_values[sp - 1] = left_value // right_value
+
+        elif opcode == LT_INT:
+            sp -= 1
+            stack_values[sp - 1] = \
+                1 if stack_values[sp - 1] < stack_values[sp] else 0
+            stack_tags[sp - 1] = _TAG_BOOL
+
+        elif opcode == OR:
+            sp -= 1
+            if stack_tags[sp] != _TAG_BOOL or stack_tags[sp - 1] != _TAG_BOOL:
+                return (_STATUS_TYPE_ERROR, 0, sp)
+            stack_values[sp - 1] = stack_values[sp - 1] | stack_values[sp]
+
+        elif opcode == AND_JUMP_IF_FALSE:
+            if stack_tags[sp - 1] != _TAG_BOOL:
+                return (_STATUS_TYPE_ERROR, 0, sp)
+            if stack_values[sp - 1] == 0:
+                pc = arg
+            else:
+                sp -= 1
+
+        elif opcode == AND_CHECK:
+            if stack_tags[sp - 1] != _TAG_BOOL:
+                return (_STATUS_TYPE_ERROR, 0, sp)
+
+        elif opcode == NOT:
+            if stack_tags[sp - 1] != _TAG_BOOL:
+                return (_STATUS_TYPE_ERROR, 0, sp)
+            stack_values[sp - 1] = 1 - stack_values[sp - 1]
+
+        elif opcode == COMPARE:
+            sp -= 1
+            left_tag = stack_tags[sp - 1]
+            right_tag = stack_tags[sp]
+            left = stack_values[sp - 1]
+            right = stack_values[sp]
+            if arg == CMP_LT:
+                if left_tag != right_tag or left_tag == _TAG_NONE:
+                    return (_STATUS_TYPE_ERROR, 0, sp)
+                result = 1 if left < right else 0
+            elif arg == CMP_LTE:
+                if left_tag == _TAG_NONE:
+                    result = 1
+                elif right_tag == _TAG_NONE:
+                    result = 0
+                else:
+                    result = 1 if left <= right else 0
+            elif arg == CMP_GT:
+                if left_tag == _TAG_NONE:
+                    result = 0
+                elif right_tag == _TAG_NONE:
+                    result = 1
+                else:
+                    result = 1 if left > right else 0
+            elif arg == CMP_GTE:
+                if left_tag == _TAG_NONE:
+                    result = 1 if right_tag == _TAG_NONE else 0
+                elif right_tag == _TAG_NONE:
+                    result = 1
+                else:
+                    result = 1 if left >= right else 0
+            else:
+                if left_tag == _TAG_NONE or right_tag == _TAG_NONE:
+                    result = 1 if (left_tag == _TAG_NONE
+                                   and right_tag == _TAG_NONE) else 0
+                else:
+                    result = 1 if left == right else 0
+                if arg == CMP_NE:
+                    result = 1 - result
+            stack_values[sp - 1] = result
+            stack_tags[sp - 1] = _TAG_BOOL
+
+        elif opcode == JUMP:
+            pc = arg
+
+        elif opcode == JUMP_IF_FALSE:
+            sp -= 1
+            if stack_tags[sp] != _TAG_BOOL:
+                return (_STATUS_TYPE_ERROR, 0, sp)
+            if stack_values[sp] == 0:
+                pc = arg
+
+        else:
+            return (_STATUS_TYPE_ERROR, 0, sp)
+
+
+if _NUMBA_AVAILABLE:
+    _numeric_kernel_jit = _njit(cache=True)(_numeric_kernel)
+
+
+def _numeric_eligible(bytecode):
+    for pc in range(0, len(bytecode.code), 2):
+        if bytecode.code[pc] == PRINT:
+            return False
+    for value, value_type in bytecode.consts:
+        if value_type is INTEGER and not isinstance(value, bool):
+            continue
+        if value_type is BOOLEAN and isinstance(value, bool):
+            continue
+        if value is None and value_type is None:
+            continue
+        return False
+    return True
+
+
+def _numeric_binding(value, tag):
+    if tag == _TAG_INT:
+        return (int(value), INTEGER)
+    if tag == _TAG_BOOL:
+        return (bool(value), BOOLEAN)
+    return (None, None)
+
+
+def _run_numeric(bytecode, variables):
+    """ Run numeric-only bytecode through the kernel.
+
+    Returns the usual (value, type, State) triple, or None when the
+    incoming variable bindings aren't integers/booleans and the caller
+    should fall back to the generic loop.
+    """
+    seed_values = []
+    seed_tags = []
+    for name in bytecode.names:
+        binding = variables.get(name)
+        if binding is None:
+            seed_values.append(0)
+            seed_tags.append(_TAG_UNSET)
+        elif binding[1] is INTEGER and not isinstance(binding[0], bool):
+            seed_values.append(binding[0])
+            seed_tags.append(_TAG_INT)
+        elif binding[1] is BOOLEAN:
+            seed_values.append(int(binding[0]))
+            seed_tags.append(_TAG_BOOL)
+        elif binding[0] is None and binding[1] is None:
+            # A stored never-run While result: representable in the
+            # kernel as the (None, None) tag, and rebindable there.
+            seed_values.append(0)
+            seed_tags.append(_TAG_NONE)
+        else:
+            return None
+
+    const_values = [0 if value is None else int(value)
+                    for value, _ in bytecode.consts]
+    const_tags = []
+    for value, value_type in bytecode.consts:
+        if value_type is INTEGER:
+            const_tags.append(_TAG_INT)
+        elif value_type is BOOLEAN:
+            const_tags.append(_TAG_BOOL)
+        else:
+            const_tags.append(_TAG_NONE)
+
+    depth = len(bytecode.code) // 2 + 1
+
+    use_jit = _NUMBA_AVAILABLE \
+        and all(abs(value) < _INT64_INPUT_LIMIT for value in const_values) \
+        and all(abs(value) < _INT64_INPUT_LIMIT for value in seed_values)
+    if use_jit:
+        var_values = _numpy.asarray(seed_values, dtype=_numpy.int64)
+        var_tags = _numpy.asarray(seed_tags, dtype=_numpy.int64)
+        stack_values = _numpy.zeros(depth, dtype=_numpy.int64)
+        stack_tags = _numpy.zeros(depth, dtype=_numpy.int64)
+        status, aux, sp = _numeric_kernel_jit(
+            _numpy.asarray(bytecode.code, dtype=_numpy.int64),
+            _numpy.asarray(const_values, dtype=_numpy.int64),
+            _numpy.asarray(const_tags, dtype=_numpy.int64),
+            var_values, var_tags, stack_values, stack_tags)
+        if status == _STATUS_OVERFLOW:
+            # An intermediate wrapped past int64; redo the whole run with
+            # exact Python integers. The seed lists were copied into the
+            # arrays, so they are still pristine.
+            use_jit = False
+    if not use_jit:
+        var_values = seed_values
+        var_tags = seed_tags
+        stack_values = [0] * depth
+        stack_tags = [0] * depth
+        status, aux, sp = _numeric_kernel(
+            list(bytecode.code), const_values, const_tags,
+            var_values, var_tags, stack_values, stack_tags)
+        if status == _STATUS_OVERFLOW:
+            # Only the INT64_MIN // -1 guard can fire on exact
+            # arithmetic; let the generic loop handle it.
+            return None
+
+    if status == _STATUS_UNASSIGNED:
+        raise InterpSyntaxError(
+            f"Cannot read from {bytecode.names[aux]} before assignment.")
+    if status == _STATUS_ASSIGN_MISMATCH:
+        raise InterpTypeError(
+            f"Mismatched types for Assignment to {bytecode.names[aux]}")
+    if status == _STATUS_MATH_ERROR:
+        raise InterpMathError("Division by zero error.")
+    if status == _STATUS_TYPE_ERROR:
+        raise InterpTypeError("Mismatched or non-numeric operand types.")
+
+    for index, name in enumerate(bytecode.names):
+        if var_tags[index] != _TAG_UNSET:
+            variables[name] = _numeric_binding(
+                var_values[index], var_tags[index])
+
+    result_value, result_type = _numeric_binding(
+        stack_values[sp - 1], stack_tags[sp - 1])
+    return (result_value, result_type, State(variables))
+
+
+def compile_while_numeric(expression):
+    """ Compile one While to bytecode for the tree walker's numeric loop
+    fast path, or None when the loop isn't in the numeric subset (string
+    or float constants, Print, or nodes the compiler doesn't know). """
+    try:
+        bytecode = compile_to_bytecode(expression)
+    except InterpSyntaxError:
+        return None
+    if not _numeric_eligible(bytecode):
+        return None
+    return bytecode
+
+
+def run_while_numeric(bytecode, state):
+    """ Run a While compiled by compile_while_numeric against `state`.
+
+    Returns the usual (value, type, State) triple, or None when the
+    caller's bindings don't fit the kernel -- values that aren't
+    integers or booleans, or types contradicting the ones the
+    specialized opcodes were inferred from -- in which case the tree
+    walker should take its generic loop.
+    """
+    variables = dict(state._vars)
+    for index, name in enumerate(bytecode.names):
+        static_type = bytecode.var_types[index]
+        if static_type is None:
+            continue
+        binding = variables.get(name)
+        if binding is not None and binding[1] is not static_type:
+            return None
+    return _run_numeric(bytecode, variables)
+
+
+def run_bytecode(bytecode, state=None):
+    variables = dict(state._vars) if state is not None else {}
+
+    # Specialized opcodes trust the types inferred from the program's own
+    # assignments. A caller-seeded binding can contradict them (the seeded
+    # value is what a read before the first Assign sees), so run the
+    # unspecialized compile of the same program in that case.
+    if variables and bytecode._expression is not None:
+        for index, name in enumerate(bytecode.names):
+            static_type = bytecode.var_types[index]
+            if static_type is None:
+                continue
+            binding = variables.get(name)
+            if binding is not None and binding[1] is not static_type:
+                bytecode = bytecode.generic()
+                break
+
+    code = bytecode.code
+    const_values = bytecode.const_values
+    const_types = bytecode.const_types
+    names = bytecode.names
+
+    if bytecode._numeric is None:
+        bytecode._numeric = _numeric_eligible(bytecode)
+    if bytecode._numeric:
+        ran = _run_numeric(bytecode, variables)
+        if ran is not None:
+            return ran
+
+    # Variables live in flat lists indexed by the slot assigned during
+    # resolution; names are only needed to seed from (and hand back) a
+    # name-keyed State and to report errors. _UNSET (rather than None)
+    # marks unassigned slots because None is a legal value and type.
+    slot_values = [_UNSET] * len(names)
+    slot_types = [_UNSET] * len(names)
+    for index, name in enumerate(names):
+        binding = variables.get(name)
+        if binding is not None:
+            slot_values[index], slot_types[index] = binding
+
+    # The operand stack is a pair of parallel lists, so no (value, type)
+    # tuple is ever allocated per instruction.
+    value_stack = []
+    type_stack = []
+    vpush = value_stack.append
+    vpop = value_stack.pop
+    tpush = type_stack.append
+    tpop = type_stack.pop
+
+    # Every compiled program ends in HALT, so the loop needs no
+    # per-instruction bound check.
+    pc = 0
+    while True:
+        opcode = code[pc]
+        arg = code[pc + 1]
+        pc += 2
+
+        if opcode == HALT:
+            break
+
+        elif opcode == LOAD_CONST:
+            vpush(const_values[arg])
+            tpush(const_types[arg])
+
+        elif opcode == LOAD_VAR:
+            if slot_types[arg] is _UNSET:
+                raise InterpSyntaxError(
+                    f"Cannot read from {names[arg]} before assignment.")
+            vpush(slot_values[arg])
+            tpush(slot_types[arg])
+
+        elif opcode == STORE_VAR:
+            value_type = type_stack[-1]
+            # A declared type of None (a stored never-run While result)
+            # leaves the variable free to take any type, as in evaluate.
+            declared = slot_types[arg]
+            if declared is not _UNSET and declared is not None \
+                    and declared is not value_type:
+                raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {value_type} to {declared}""")
+            slot_values[arg] = value_stack[-1]
+            slot_types[arg] = value_type
+
+        elif opcode == POP:
+            vpop()
+            tpop()
+
+        elif opcode == ADD:
+            right_type = tpop()
+            left_type = type_stack[-1]
+            if left_type is not right_type:
+                raise InterpTypeError(f"""Mismatched types for Add:
+            Cannot add {left_type} to {right_type}""")
+            if left_type is not INTEGER and left_type is not STRING \
+                    and left_type is not FLOATING_POINT:
+                raise InterpTypeError(f"""Cannot add {left_type}s""")
+            right_value = vpop()
+            value_stack[-1] = value_stack[-1] + right_value
+
+        elif opcode == SUBTRACT:
+            right_type = tpop()
+            left_type = type_stack[-1]
+            if left_type is not right_type:
+                raise InterpTypeError(f"""Mismatched types for Subtract:
+            Cannot subtract {right_type} from {left_type}""")
+            if left_type is not INTEGER and left_type is not FLOATING_POINT:
+                raise InterpTypeError(
+                    "Subtraction requires operands of numeric types.")
+            right_value = vpop()
+            value_stack[-1] = value_stack[-1] - right_value
+
+        elif opcode == MULTIPLY:
+            right_type = tpop()
+            left_type = type_stack[-1]
+            if left_type is not right_type:
+                raise InterpTypeError(f"""Mismatched types for Multiply:
+            Cannot multiply {left_type} by {right_type}""")
+            if left_type is not INTEGER and left_type is not FLOATING_POINT:
+                raise InterpTypeError(
+                    "Multiplication requires operands of numeric types.")
+            right_value = vpop()
+            value_stack[-1] = value_stack[-1] * right_value
+
+        elif opcode == DIVIDE:
+            right_type = tpop()
+            left_type = type_stack[-1]
+            if left_type is not right_type:
+                raise InterpTypeError(f"""Mismatched types for Divide:
+            Cannot divide {left_type} by {right_type}""")
+            if left_type is not INTEGER and left_type is not FLOATING_POINT:
+                raise InterpTypeError("Division requires numeric types.")
+            right_value = vpop()
+            if right_value == 0:
+                raise InterpMathError("Division by zero error.")
+            if left_type is INTEGER:
+                value_stack[-1] = value_stack[-1] // right_value
+            else:
+                value_stack[-1] = value_stack[-1] / right_value
+
+        elif opcode == ADD_INT:
+            tpop()
+            right_value = vpop()
+            value_stack[-1] = value_stack[-1] + right_value
+
+        elif opcode == SUBTRACT_INT:
+            tpop()
+            right_value = vpop()
+            value_stack[-1] = value_stack[-1] - right_value
+
+        elif opcode == MULTIPLY_INT:
+            tpop()
+            right_value = vpop()
+            value_stack[-1] = value_stack[-1] * right_value
+
+        elif opcode == DIVIDE_INT:
+            tpop()
+            right_value = vpop()
+            if right_value == 0:
+                raise InterpMathError("Division by zero error.")
+            value_stack[-1] = value_stack[-1] // right_value
+
+        elif opcode == LT_INT:
+            tpop()
+            right_value = vpop()
+            value_stack[-1] = value_stack[-1] < right_value
+            type_stack[-1] = BOOLEAN
+
+        elif opcode == AND_JUMP_IF_FALSE:
+            if type_stack[-1] is not BOOLEAN:
+                raise InterpTypeError(
+                    "Cannot perform logical and on non-boolean operands.")
+            if value_stack[-1] is False:
+                pc = arg
+            else:
+                vpop()
+                tpop()
+
+        elif opcode == AND_CHECK:
+            right_type = type_stack[-1]
+            if right_type is not BOOLEAN:
+                raise InterpTypeError(f"""Mismatched types for And:
+            Cannot evaluate {BOOLEAN} and {right_type}""")
+
+        elif opcode == OR:
+            right_type = tpop()
+            left_type = type_stack[-1]
+            if left_type is not BOOLEAN or right_type is not BOOLEAN:
+                raise InterpTypeError("Or operation requires boolean operands.")
+            right_value = vpop()
+            value_stack[-1] = value_stack[-1] or right_value
+
+        elif opcode == NOT:
+            if type_stack[-1] is not BOOLEAN:
+                raise InterpTypeError("Logical NOT requires a boolean type.")
+            value_stack[-1] = not value_stack[-1]
+
+        elif opcode == COMPARE:
+            right_type = tpop()
+            right_value = vpop()
+            left_value = value_stack[-1]
+            if arg == CMP_LT:
+                left_type = type_stack[-1]
+                if left_type is not right_type:
+                    raise InterpTypeError(f"""Mismatched types for Lt:
+            Cannot compare {left_type} and {right_type}""")
+                if left_type is None:
+                    raise InterpTypeError(
+                        f"Cannot perform < on {left_type} type.")
+                value_stack[-1] = False if left_type is UNIT \
+                    else left_value < right_value
+            elif arg == CMP_EQ or arg == CMP_NE or (
+                    left_value is not None and right_value is not None):
+                # The common case: one table load instead of an opcode
+                # branch per comparison. ==/!= are None-safe, the
+                # ordering ops take this path only on non-Unit operands.
+                value_stack[-1] = _CMP_OPS[arg](left_value, right_value)
+            elif arg == CMP_LTE:
+                value_stack[-1] = left_value is None
+            elif arg == CMP_GT:
+                value_stack[-1] = left_value is not None
+            else:
+                value_stack[-1] = left_value is not None or right_value is None
+            type_stack[-1] = BOOLEAN
+
+        elif opcode == PRINT:
+            if type_stack[-1] is UNIT:
+                print("Unit")
+            else:
+                print(f"{value_stack[-1]}")
+
+        elif opcode == JUMP:
+            pc = arg
+
+        elif opcode == JUMP_IF_FALSE:
+            if tpop() is not BOOLEAN:
+                raise InterpTypeError("Condition must be boolean")
+            if not vpop():
+                pc = arg
+
+        else:
+            raise InterpSyntaxError("Unhandled!")
+
+    for index, name in enumerate(names):
+        if slot_types[index] is not _UNSET:
+            variables[name] = (slot_values[index], slot_types[index])
+
+    return (vpop(), tpop(), State(variables))
@@ -9,19 +9,19 @@ class InterpError(Exception):
 
 class InterpSyntaxError(InterpError):
   def __init__(self, error_msg = None):
-    if error_msg == None:
+    if error_msg is None:
       error_msg = "InterpSyntaxError"
     super().__init__(error_msg)
 
 class InterpTypeError(InterpError):
   def __init__(self, error_msg = None):
-    if error_msg == None:
+    if error_msg is None:
       error_msg = "InterpTypeError"
     super().__init__(error_msg)
 
 class InterpMathError(InterpError):
   def __init__(self, error_msg = None):
-    if error_msg == None:
+    if error_msg is None:
       error_msg = "InterpMathError"
     super().__init__(error_msg)
 
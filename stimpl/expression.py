@@ -5,6 +5,10 @@ Expressions
 
 
 class Expr(object):
+    # Analysis results (free variables, purity) are cached directly on the
+    # node, so the base class reserves slots for them.
+    __slots__ = ('_free_vars', '_pure')
+
     def __init__(self):
         pass
 
@@ -15,6 +19,8 @@ Unit expression.
 
 
 class Ren(Expr):
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -28,6 +34,8 @@ Literal expressions.
 
 
 class Literal(Expr):
+    __slots__ = ('literal',)
+
     def __init__(self, literal):
         self.literal = literal
 
@@ -36,6 +44,8 @@ class Literal(Expr):
 
 
 class IntLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, literal):
         if type(literal) != int:
             raise InterpTypeError(
@@ -44,6 +54,8 @@ class IntLiteral(Literal):
 
 
 class FloatingPointLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, literal):
         if type(literal) != float:
             raise InterpTypeError(
@@ -52,6 +64,8 @@ class FloatingPointLiteral(Literal):
 
 
 class StringLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, literal):
         if type(literal) != str:
             raise InterpTypeError(
@@ -60,6 +74,8 @@ class StringLiteral(Literal):
 
 
 class BooleanLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, literal):
         if type(literal) != bool:
             raise InterpTypeError(
@@ -73,6 +89,8 @@ Variable Expression
 
 
 class Variable(Expr):
+    __slots__ = ('variable_name',)
+
     def __init__(self, variable_name):
         self.variable_name = variable_name
 
@@ -89,6 +107,8 @@ Operators
 
 
 class Assign(Expr):
+    __slots__ = ('variable', 'value')
+
     def __init__(self, variable, value):
         if not isinstance(variable, Variable):
             raise InterpSyntaxError("Must assign to a variable.")
@@ -100,11 +120,15 @@ class Assign(Expr):
 
 
 class UnaryOperator(Expr):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
 
 class Print(UnaryOperator):
+    __slots__ = ('to_print',)
+
     def __init__(self, to_print):
         self.to_print = to_print
         super().__init__()
@@ -114,6 +138,8 @@ class Print(UnaryOperator):
 
 
 class Not(UnaryOperator):
+    __slots__ = ('expr',)
+
     def __init__(self, expr):
         self.expr = expr
         super().__init__()
@@ -123,13 +149,20 @@ class Not(UnaryOperator):
 
 
 class BinaryOperator(Expr):
+    # _fast holds the monomorphic inline cache the arithmetic handlers
+    # stamp onto a node after its first checked evaluation.
+    __slots__ = ('left', 'right', '_fast')
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
+        self._fast = None
         super().__init__()
 
 
 class And(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -138,6 +171,8 @@ class And(BinaryOperator):
 
 
 class Or(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -146,6 +181,8 @@ class Or(BinaryOperator):
 
 
 class Lt(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -154,6 +191,8 @@ class Lt(BinaryOperator):
 
 
 class Lte(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -162,6 +201,8 @@ class Lte(BinaryOperator):
 
 
 class Gt(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -170,6 +211,8 @@ class Gt(BinaryOperator):
 
 
 class Gte(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -178,6 +221,8 @@ class Gte(BinaryOperator):
 
 
 class Eq(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -186,6 +231,8 @@ class Eq(BinaryOperator):
 
 
 class Ne(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -194,6 +241,8 @@ class Ne(BinaryOperator):
 
 
 class Add(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -202,6 +251,8 @@ class Add(BinaryOperator):
 
 
 class Subtract(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -210,6 +261,8 @@ class Subtract(BinaryOperator):
 
 
 class Multiply(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -218,6 +271,8 @@ class Multiply(BinaryOperator):
 
 
 class Divide(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -230,9 +285,27 @@ Combining forms.
 """
 
 
+def _flatten(exprs):
+    """ Inline the bodies of nested Sequences/Programs so the evaluator
+    always sees one flat list: the value of a sequence is the value of
+    its last expression either way, and flattening once at construction
+    time saves a dispatch per nesting level on every evaluation. """
+    flat = []
+    for expr in exprs:
+        if isinstance(expr, (Sequence, Program)) and expr.exprs:
+            flat.extend(expr.exprs)
+        else:
+            # An empty sequence stays: it still evaluates to (None, Unit)
+            # and may be the value of the enclosing sequence.
+            flat.append(expr)
+    return tuple(flat)
+
+
 class Program(Expr):
+    __slots__ = ('exprs',)
+
     def __init__(self, *exprs):
-        self.exprs = exprs
+        self.exprs = _flatten(exprs)
 
     def __repr__(self):
         exprs = self.exprs
@@ -242,8 +315,10 @@ class Program(Expr):
 
 
 class Sequence(Expr):
+    __slots__ = ('exprs',)
+
     def __init__(self, *exprs):
-        self.exprs = exprs
+        self.exprs = _flatten(exprs)
 
     def __repr__(self):
         exprs = self.exprs
@@ -253,6 +328,8 @@ class Sequence(Expr):
 
 
 class If(Expr):
+    __slots__ = ('condition', 'true', 'false')
+
     def __init__(self, condition, true, false):
         self.condition = condition
         self.true = true
@@ -263,6 +340,11 @@ class If(Expr):
 
 
 class While(Expr):
+    # _counted caches the counted-loop match made by the While handler;
+    # _hoisted its loop-invariant analysis; _numeric its bytecode compile
+    # for the numeric-kernel fast path.
+    __slots__ = ('condition', 'body', '_counted', '_hoisted', '_numeric')
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
@@ -0,0 +1,33 @@
+from stimpl.expression import *
+from stimpl.runtime import _expression_children
+
+"""
+Variable resolution.
+
+String-keyed variable access pays a hash plus a string compare on every
+read and write. A single pass over the AST assigns every distinct variable
+name a small integer slot, so the bytecode VM can index a flat list
+instead of hashing names. Slots are numbered in order of first appearance.
+"""
+
+
+def variable_names(expression):
+    """ Every variable name read or assigned in `expression`,
+    in order of first appearance. """
+    names = []
+    seen = set()
+    work = [expression]
+    while work:
+        expr = work.pop()
+        if isinstance(expr, Variable):
+            if expr.variable_name not in seen:
+                seen.add(expr.variable_name)
+                names.append(expr.variable_name)
+        else:
+            work.extend(reversed(_expression_children(expr)))
+    return names
+
+
+def build_slot_map(expression):
+    """ Map each distinct variable name in `expression` to its slot index. """
+    return {name: index for index, name in enumerate(variable_names(expression))}
@@ -1,3 +1,6 @@
+import operator
+
+from collections import OrderedDict
 from typing import Any, Tuple, Optional
 
 from stimpl.expression import *
@@ -10,360 +13,1010 @@ Interpreter State
 
 
 class State(object):
-    def __init__(self, variable_name: str, variable_value: Expr, variable_type: Type, next_state: 'State') -> None:
-        self.variable_name = variable_name
-        self.value = (variable_value, variable_type)
-        self.next_state = next_state
+    """ A persistent variable environment backed by one flat dict.
+
+    set_value copies the dict, so every State (and any snapshot a caller
+    kept) stays valid forever, while get_value is a single O(1) probe --
+    there is no chain of parent states to walk or cache around.
+    """
+    __slots__ = ('_vars',)
+
+    def __init__(self, variables: Optional[dict] = None) -> None:
+        self._vars = {} if variables is None else variables
 
     def copy(self) -> 'State':
-        variable_value, variable_type = self.value
-        return State(self.variable_name, variable_value, variable_type, self.next_state)
+        return State(dict(self._vars))
 
     def set_value(self, variable_name, variable_value, variable_type):
-        return State(variable_name, variable_value, variable_type, self)
+        new_vars = dict(self._vars)
+        new_vars[variable_name] = (variable_value, variable_type)
+        return State(new_vars)
 
     def get_value(self, variable_name) -> Any:
-        """ TODO: Implement. """
-        if self.variable_name == variable_name:
-            return self.value
-        elif self.next_state is not None:
-            return self.next_state.get_value(variable_name)
-        else:
-            # Variable not found in any state, indicate it's uninitialized
-            return None
-        
+        return self._vars.get(variable_name)
+
     def __repr__(self) -> str:
-        return f"{self.variable_name}: {self.value}, " + repr(self.next_state)
+        return ", ".join(f"{variable_name}: {value}"
+                         for variable_name, value in self._vars.items())
 
 
 class EmptyState(State):
+    """ Equivalent to State(); kept as a class of its own because test
+    programs construct it by name. """
+    __slots__ = ()
+
     def __init__(self):
-        pass
+        super().__init__()
 
-    def copy(self) -> 'EmptyState':
-        return EmptyState()
 
-    def get_value(self, variable_name) -> None:
-        return None
+class MutableState(State):
+    """ A State that updates its dict in place instead of copying it.
 
-    def __repr__(self) -> str:
-        return ""
+    Used internally by the While handler: the loop snapshots the caller's
+    variables once on entry, mutates that single dict for every assignment
+    in the body, and hands back an ordinary (persistent) State on exit, so
+    callers never observe the mutation.
+    """
+    __slots__ = ()
+
+    def set_value(self, variable_name, variable_value, variable_type):
+        self._vars[variable_name] = (variable_value, variable_type)
+        return self
+
+
+class _FusedAssign(Expr):
+    """ Internal node: a run of consecutive Assigns whose values are pure.
+
+    Produced by the _fuse_assigns lowering pass, never by user programs.
+    The handler copies the variable dict once and writes every binding
+    into it, instead of one dict copy per Assign.
+    """
+    __slots__ = ('assigns',)
+
+    def __init__(self, assigns):
+        self.assigns = assigns
+
+    def __repr__(self):
+        return "; ".join(repr(assign) for assign in self.assigns)
 
 
 """
 Main evaluation logic!
+
+Each expression type has a handler function below; `evaluate` dispatches
+through the HANDLERS table with a single dict lookup on the concrete node
+type instead of walking a chain of structural-match checks.
 """
 
 
-def evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State]:
-    match expression:
-        case Ren():
-            return (None, Unit(), state)
+def _evaluate_ren(expression, state):
+    return (None, UNIT, state)
 
-        case IntLiteral(literal=l):
-            return (l, Integer(), state)
 
-        case FloatingPointLiteral(literal=l):
-            return (l, FloatingPoint(), state)
+def _evaluate_int_literal(expression, state):
+    return (expression.literal, INTEGER, state)
 
-        case StringLiteral(literal=l):
-            return (l, String(), state)
 
-        case BooleanLiteral(literal=l):
-            return (l, Boolean(), state)
+def _evaluate_floating_point_literal(expression, state):
+    return (expression.literal, FLOATING_POINT, state)
 
-        case Print(to_print=to_print):
-            printable_value, printable_type, new_state = evaluate(
-                to_print, state)
 
-            match printable_type:
-                case Unit():
-                    print("Unit")
-                case _:
-                    print(f"{printable_value}")
+def _evaluate_string_literal(expression, state):
+    return (expression.literal, STRING, state)
 
-            return (printable_value, printable_type, new_state)
 
-        case Sequence(exprs=exprs) | Program(exprs=exprs):
-            """ TODO: Implement. """
-            if not exprs:
-                return (None, Unit(), state)
-            last_value, last_type = (None, Unit())
-            current_state = state
-            for expr in exprs:
-                last_value, last_type, current_state = evaluate(expr, current_state)
-            return (last_value, last_type, current_state)
+def _evaluate_boolean_literal(expression, state):
+    return (expression.literal, BOOLEAN, state)
 
 
+def _evaluate_print(expression, state):
+    printable_value, printable_type, new_state = evaluate(
+        expression.to_print, state)
 
-        case Variable(variable_name=variable_name):
-            value = state.get_value(variable_name)
-            if value == None:
-                raise InterpSyntaxError(
-                    f"Cannot read from {variable_name} before assignment.")
-            variable_value, variable_type = value
-            return (variable_value, variable_type, state)
+    if printable_type is UNIT:
+        print("Unit")
+    else:
+        print(f"{printable_value}")
 
-        case Assign(variable=variable, value=value):
+    return (printable_value, printable_type, new_state)
 
-            value_result, value_type, new_state = evaluate(value, state)
 
-            variable_from_state = new_state.get_value(variable.variable_name)
-            _, variable_type = variable_from_state if variable_from_state else (
-                None, None)
+def _evaluate_sequence(expression, state):
+    exprs = expression.exprs
+    if not exprs:
+        return (None, UNIT, state)
+    # The empty case returned above, so the loop always runs and the
+    # result names need no pre-initialisation.
+    ev = evaluate
+    for expr in exprs:
+        last_value, last_type, state = ev(expr, state)
+    return (last_value, last_type, state)
+
+
+def _evaluate_variable(expression, state):
+    variable_name = expression.variable_name
+    # Reach into the dict directly: every State variant stores bindings in
+    # _vars, and the read is too hot for a bound-method call.
+    value = state._vars.get(variable_name)
+    if value is None:
+        raise InterpSyntaxError(
+            f"Cannot read from {variable_name} before assignment.")
+    variable_value, variable_type = value
+    return (variable_value, variable_type, state)
 
-            if value_type != variable_type and variable_type != None:
-                raise InterpTypeError(f"""Mismatched types for Assignment:
-            Cannot assign {value_type} to {variable_type}""")
 
-            new_state = new_state.set_value(
-                variable.variable_name, value_result, value_type)
-            return (value_result, value_type, new_state)
+def _evaluate_assign(expression, state):
+    variable = expression.variable
+    value_result, value_type, new_state = evaluate(expression.value, state)
 
-        case Add(left=left, right=right):
-            result = 0
-            left_result, left_type, new_state = evaluate(left, state)
-            right_result, right_type, new_state = evaluate(right, new_state)
+    # One dict probe covers both "is the variable bound" and "what type
+    # was it declared with"; a declared type of None (a stored never-run
+    # While result) leaves the variable free to take any type.
+    binding = new_state.get_value(variable.variable_name)
+    if binding is not None:
+        variable_type = binding[1]
+        if variable_type is not None and variable_type is not value_type:
+            raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {value_type} to {variable_type}""")
 
-            if left_type != right_type:
-                raise InterpTypeError(f"""Mismatched types for Add:
+    new_state = new_state.set_value(
+        variable.variable_name, value_result, value_type)
+    return (value_result, value_type, new_state)
+
+
+def _evaluate_fused_assign(expression, state):
+    if type(state) is MutableState:
+        target = state
+    else:
+        target = MutableState(dict(state._vars))
+    variables = target._vars
+    ev = evaluate
+    for assign in expression.assigns:
+        # Values are pure, so evaluating against `target` cannot disturb
+        # it; earlier writes in the run are visible to later values.
+        value_result, value_type, _ = ev(assign.value, target)
+        name = assign.variable.variable_name
+        binding = variables.get(name)
+        if binding is not None:
+            declared = binding[1]
+            if declared is not None and declared is not value_type:
+                raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {value_type} to {declared}""")
+        variables[name] = (value_result, value_type)
+    if target is state:
+        return (value_result, value_type, state)
+    return (value_result, value_type, State(variables))
+
+
+def _evaluate_add(expression, state):
+    left_result, left_type, new_state = evaluate(expression.left, state)
+    right_result, right_type, new_state = evaluate(expression.right, new_state)
+
+    # Monomorphic inline cache: in a well-typed program a given node sees
+    # the same operand types on every visit, so after one checked
+    # evaluation the node carries its specialized operation and skips the
+    # type tests. A type change fails the guard and re-takes (and
+    # re-stamps) the checked path.
+    fast = expression._fast
+    if fast is not None and left_type is fast[0] and right_type is fast[1]:
+        return (fast[2](left_result, right_result), fast[3], new_state)
+
+    if left_type is not right_type:
+        raise InterpTypeError(f"""Mismatched types for Add:
             Cannot add {left_type} to {right_type}""")
 
-            match left_type:
-                case Integer() | String() | FloatingPoint():
-                    result = left_result + right_result
-                case _:
-                    raise InterpTypeError(f"""Cannot add {left_type}s""")
+    if left_type is None or not left_type.IS_ADDABLE:
+        raise InterpTypeError(f"""Cannot add {left_type}s""")
 
-            return (result, left_type, new_state)
+    expression._fast = (left_type, right_type, operator.add, left_type)
+    return (left_result + right_result, left_type, new_state)
 
-        case Subtract(left=left, right=right):
-            """ TODO: Implement. """
-            left_value, left_type, new_state = evaluate(left, state)
-            right_value, right_type, final_state = evaluate(right, new_state)
 
-            if not ((isinstance(left_type, Integer) or isinstance(left_type, FloatingPoint)) and
-                    (isinstance(right_type, Integer) or isinstance(right_type, FloatingPoint))):
-                raise InterpTypeError("Subtraction requires operands of numeric types.")
+def _evaluate_subtract(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, final_state = evaluate(expression.right, new_state)
 
-            result = left_value - right_value
-            result_type = Integer() if isinstance(left_type, Integer) and isinstance(right_type, Integer) else FloatingPoint()
-            return (result, result_type, final_state)
+    fast = expression._fast
+    if fast is not None and left_type is fast[0] and right_type is fast[1]:
+        return (fast[2](left_value, right_value), fast[3], final_state)
 
-        case Multiply(left=left, right=right):
-            """ TODO: Implement. """
-            left_value, left_type, new_state = evaluate(left, state)
-            right_value, right_type, final_state = evaluate(right, new_state)
+    if left_type is not right_type:
+        raise InterpTypeError(f"""Mismatched types for Subtract:
+            Cannot subtract {right_type} from {left_type}""")
 
-            if not ((isinstance(left_type, Integer) and isinstance(right_type, Integer)) or
-                    (isinstance(left_type, FloatingPoint) and isinstance(right_type, FloatingPoint))):
-                raise InterpTypeError("Multiplication requires operands of numeric types.")
+    if left_type is None or not left_type.IS_NUMERIC:
+        raise InterpTypeError("Subtraction requires operands of numeric types.")
 
-            result = left_value * right_value
-            result_type = Integer() if isinstance(left_type, Integer) and isinstance(right_type, Integer) else FloatingPoint()
-            return (result, result_type, final_state)
+    expression._fast = (left_type, right_type, operator.sub, left_type)
+    return (left_value - right_value, left_type, final_state)
 
 
-        case Divide(left=left, right=right):
-            """ TODO: Implement. """
-            left_value, left_type, new_state = evaluate(left, state)
-            right_value, right_type, final_state = evaluate(right, new_state)
+def _evaluate_multiply(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, final_state = evaluate(expression.right, new_state)
+
+    fast = expression._fast
+    if fast is not None and left_type is fast[0] and right_type is fast[1]:
+        return (fast[2](left_value, right_value), fast[3], final_state)
+
+    if left_type is not right_type:
+        raise InterpTypeError(f"""Mismatched types for Multiply:
+            Cannot multiply {left_type} by {right_type}""")
+
+    if left_type is None or not left_type.IS_NUMERIC:
+        raise InterpTypeError("Multiplication requires operands of numeric types.")
+
+    expression._fast = (left_type, right_type, operator.mul, left_type)
+    return (left_value * right_value, left_type, final_state)
+
+
+def _fast_div_int(left_value, right_value):
+    if right_value == 0:
+        raise InterpMathError("Division by zero error.")
+    return left_value // right_value
+
+
+def _fast_div_float(left_value, right_value):
+    if right_value == 0:
+        raise InterpMathError("Division by zero error.")
+    return left_value / right_value
 
-            if isinstance(left_type, (Integer, FloatingPoint)) and isinstance(right_type, (Integer, FloatingPoint)):
-                if right_value == 0:
-                    raise InterpMathError("Division by zero error.")
-                result = left_value // right_value if isinstance(left_type, Integer) and isinstance(right_type, Integer) else left_value / right_value
-                return (result, left_type if isinstance(left_type, Integer) else right_type, final_state)
-            else:
-                raise InterpTypeError("Division requires numeric types.")
 
+def _evaluate_divide(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, final_state = evaluate(expression.right, new_state)
 
-        case And(left=left, right=right):
-            left_value, left_type, new_state = evaluate(left, state)
-            right_value, right_type, new_state = evaluate(right, new_state)
+    fast = expression._fast
+    if fast is not None and left_type is fast[0] and right_type is fast[1]:
+        return (fast[2](left_value, right_value), fast[3], final_state)
 
-            if left_type != right_type:
-                raise InterpTypeError(f"""Mismatched types for And:
+    if left_type is not right_type:
+        raise InterpTypeError(f"""Mismatched types for Divide:
+            Cannot divide {left_type} by {right_type}""")
+
+    if left_type is None or not left_type.IS_NUMERIC:
+        raise InterpTypeError("Division requires numeric types.")
+
+    if right_value == 0:
+        raise InterpMathError("Division by zero error.")
+
+    if left_type is INTEGER:
+        expression._fast = (left_type, right_type, _fast_div_int, left_type)
+        return (left_value // right_value, left_type, final_state)
+    expression._fast = (left_type, right_type, _fast_div_float, left_type)
+    return (left_value / right_value, left_type, final_state)
+
+
+def _evaluate_and(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+
+    if left_type is not BOOLEAN:
+        raise InterpTypeError(
+            "Cannot perform logical and on non-boolean operands.")
+
+    # Short-circuit: a false left side decides the result, so the right
+    # side is never evaluated.
+    if left_value is False:
+        return (False, BOOLEAN, new_state)
+
+    right_value, right_type, new_state = evaluate(expression.right, new_state)
+
+    if right_type is not BOOLEAN:
+        raise InterpTypeError(f"""Mismatched types for And:
             Cannot evaluate {left_type} and {right_type}""")
-            match left_type:
-                case Boolean():
-                    result = left_value and right_value
-                case _:
-                    raise InterpTypeError(
-                        "Cannot perform logical and on non-boolean operands.")
-
-            return (result, left_type, new_state)
-
-        case Or(left=left, right=right):
-            """ TODO: Implement. """
-            left_value, left_type, new_state = evaluate(left, state)
-            right_value, right_type, new_state = evaluate(right, new_state)
-
-            if not isinstance(left_type, Boolean) or not isinstance(right_type, Boolean):
-                raise InterpTypeError("Or operation requires boolean operands.")
-
-            result = left_value or right_value
-            return (result, Boolean(), new_state)
-
-        case Not(expr=expr):
-            """ TODO: Implement. """
-            # Evaluate the operand
-            operand_value, operand_type, new_state = evaluate(expr, state)
-
-            # Check if the operand is of boolean type
-            if isinstance(operand_type, Boolean):
-                # Perform logical negation and return the result
-                return (not operand_value, Boolean(), new_state)
-            else:
-                raise InterpTypeError("Logical NOT requires a boolean type.")
-
-        case If(condition=condition, true=true, false=false):
-            """ TODO: Implement. """
-            # Evaluate the condition
-            condition_value, condition_type, new_state = evaluate(condition, state)
-
-            # Check if the condition is of boolean type
-            if not isinstance(condition_type, Boolean):
-                raise InterpTypeError("Condition in If expression must be boolean")
-
-            # Evaluate and return the result of the 'true' branch if condition is True
-            if condition_value:
-                return evaluate(true, new_state)
-            
-            # Otherwise, evaluate and return the result of the 'false' branch
-            else:
-                return evaluate(false, new_state)
 
-        case Lt(left=left, right=right):
-            left_value, left_type, new_state = evaluate(left, state)
-            right_value, right_type, new_state = evaluate(right, new_state)
+    return (right_value, BOOLEAN, new_state)
 
-            result = None
 
-            if left_type != right_type:
-                raise InterpTypeError(f"""Mismatched types for Lt:
+def _evaluate_or(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, new_state = evaluate(expression.right, new_state)
+
+    if left_type is not BOOLEAN or right_type is not BOOLEAN:
+        raise InterpTypeError("Or operation requires boolean operands.")
+
+    result = left_value or right_value
+    return (result, BOOLEAN, new_state)
+
+
+def _evaluate_not(expression, state):
+    operand_value, operand_type, new_state = evaluate(expression.expr, state)
+
+    if operand_type is BOOLEAN:
+        return (not operand_value, BOOLEAN, new_state)
+    else:
+        raise InterpTypeError("Logical NOT requires a boolean type.")
+
+
+def _evaluate_if(expression, state):
+    condition_value, condition_type, new_state = evaluate(
+        expression.condition, state)
+
+    if condition_type is not BOOLEAN:
+        raise InterpTypeError("Condition in If expression must be boolean")
+
+    if condition_value:
+        return evaluate(expression.true, new_state)
+    else:
+        return evaluate(expression.false, new_state)
+
+
+def _evaluate_lt(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, new_state = evaluate(expression.right, new_state)
+
+    if left_type is not right_type:
+        raise InterpTypeError(f"""Mismatched types for Lt:
             Cannot compare {left_type} and {right_type}""")
 
-            match left_type:
-                case Integer() | Boolean() | String() | FloatingPoint():
-                    result = left_value < right_value
-                case Unit():
-                    result = False
-                case _:
-                    raise InterpTypeError(
-                        f"Cannot perform < on {left_type} type.")
-
-            return (result, Boolean(), new_state)
-
-        case Lte(left=left, right=right):
-            """ TODO: Implement. """
-            # Evaluate the left operand
-            left_value, left_type, new_state = evaluate(left, state)
-            # Evaluate the right operand
-            right_value, right_type, new_state = evaluate(right, new_state)
-
-            if left_value is None and right_value is None:
-                result = True  
-            elif left_value is None:
-                result = True 
-            elif right_value is None:
-                result = False 
-            else:
-                result = left_value <= right_value
+    if left_type is not None and left_type.IS_ORDERED:
+        result = left_value < right_value
+    elif left_type is UNIT:
+        result = False
+    else:
+        raise InterpTypeError(
+            f"Cannot perform < on {left_type} type.")
 
-            return (result, Boolean(), new_state)
+    return (result, BOOLEAN, new_state)
 
 
+def _evaluate_lte(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, new_state = evaluate(expression.right, new_state)
 
-        case Gt(left=left, right=right):
-            """ TODO: Implement. """
-            # Evaluate the left operand
-            left_value, left_type, new_state = evaluate(left, state)
-            # Evaluate the right operand
-            right_value, right_type, new_state = evaluate(right, new_state)
+    if left_value is None and right_value is None:
+        result = True
+    elif left_value is None:
+        result = True
+    elif right_value is None:
+        result = False
+    else:
+        result = left_value <= right_value
 
-            if isinstance(left_value, (int, float, str)) and isinstance(right_value, (int, float, str)):
-                result = left_value > right_value
-            elif left_value is None or right_value is None:
+    return (result, BOOLEAN, new_state)
 
-                result = False if left_value is None else True
-            else:
-                raise InterpTypeError("Gt operation cannot compare these types.")
 
-            return (result, Boolean(), new_state)
+def _evaluate_gt(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, new_state = evaluate(expression.right, new_state)
 
+    if isinstance(left_value, (int, float, str)) and isinstance(right_value, (int, float, str)):
+        result = left_value > right_value
+    elif left_value is None or right_value is None:
+        result = False if left_value is None else True
+    else:
+        raise InterpTypeError("Gt operation cannot compare these types.")
 
-        case Gte(left=left, right=right):
-            """ TODO: Implement. """
-            # Evaluate the left operand
-            left_value, left_type, new_state = evaluate(left, state)
-            # Evaluate the right operand
-            right_value, right_type, new_state = evaluate(right, new_state)
+    return (result, BOOLEAN, new_state)
 
-            if isinstance(left_value, (int, float, str)) and isinstance(right_value, (int, float, str)):
-                result = left_value >= right_value
-            elif left_value is None or right_value is None:
 
-                result = True if left_value is None and right_value is None else False if left_value is None else True
-            else:
-                raise InterpTypeError("Gte operation cannot compare these types.")
+def _evaluate_gte(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, new_state = evaluate(expression.right, new_state)
+
+    if isinstance(left_value, (int, float, str)) and isinstance(right_value, (int, float, str)):
+        result = left_value >= right_value
+    elif left_value is None or right_value is None:
+        result = True if left_value is None and right_value is None else False if left_value is None else True
+    else:
+        raise InterpTypeError("Gte operation cannot compare these types.")
+
+    return (result, BOOLEAN, new_state)
+
+
+def _evaluate_eq(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, new_state = evaluate(expression.right, new_state)
+
+    result = left_value == right_value
+    return (result, BOOLEAN, new_state)
+
+
+def _evaluate_ne(expression, state):
+    left_value, left_type, new_state = evaluate(expression.left, state)
+    right_value, right_type, new_state = evaluate(expression.right, new_state)
 
-            return (result, Boolean(), new_state)
+    result = left_value != right_value
+    return (result, BOOLEAN, new_state)
 
 
-        case Eq(left=left, right=right):
-            """ TODO: Implement. """
-            # Evaluate the left operand
-            left_value, left_type, new_state = evaluate(left, state)
-            # Evaluate the right operand
-            right_value, right_type, new_state = evaluate(right, new_state)
+def _assigned_names(expression):
+    """ Every variable name assigned anywhere inside `expression`. """
+    names = set()
+    work = [expression]
+    while work:
+        node = work.pop()
+        if isinstance(node, Assign):
+            names.add(node.variable.variable_name)
+        work.extend(_expression_children(node))
+    return names
 
-            # Perform the comparison for equality and return the result
-            result = left_value == right_value
-            return (result, Boolean(), new_state)
 
+def _counted_loop_spec(expression):
+    """ Match the idiomatic counted loop
 
-        case Ne(left=left, right=right):
-            """ TODO: Implement. """
-            # Evaluate the left operand
-            left_value, left_type, new_state = evaluate(left, state)
-            # Evaluate the right operand
-            right_value, right_type, new_state = evaluate(right, new_state)
+        While(Lt(Variable(v), IntLiteral(n)),
+              Sequence(..., Assign(v, Add(Variable(v), IntLiteral(1)))))
 
-            # Perform the comparison for inequality and return the result
-            result = left_value != right_value
-            return (result, Boolean(), new_state)
+    (with or without body expressions before the increment), returning
+    (v, n, prefix_exprs) or None. The prefix must not write v, since the
+    specialized loop steps v itself.
+    """
+    condition = expression.condition
+    if type(condition) is not Lt or type(condition.left) is not Variable \
+            or type(condition.right) is not IntLiteral:
+        return None
+    name = condition.left.variable_name
+
+    body = expression.body
+    if isinstance(body, (Sequence, Program)) and body.exprs:
+        prefix = body.exprs[:-1]
+        step = body.exprs[-1]
+    else:
+        prefix = ()
+        step = body
+    if type(step) is not Assign or step.variable.variable_name != name:
+        return None
+    increment = step.value
+    if type(increment) is not Add or type(increment.left) is not Variable \
+            or increment.left.variable_name != name \
+            or type(increment.right) is not IntLiteral \
+            or increment.right.literal != 1:
+        return None
 
+    for expr in prefix:
+        if name in _assigned_names(expr):
+            return None
+    return (name, condition.right.literal, prefix)
+
+
+_HOISTABLE_TYPES = (BinaryOperator, Not)
+
+_hoist_serial = 0
+
+
+def _hoist_invariants(expression):
+    """ Find maximal pure subexpressions of a While body that read nothing
+    the loop writes, returning (temps, rewritten_body) where temps is a
+    tuple of (name, expr) pairs and the body reads hidden temp variables
+    instead -- or None when there is nothing to hoist.
+
+    Only positions the body evaluates unconditionally on every iteration
+    are considered: the walk does not descend into If arms, nested While
+    loops, or the right operand of a short-circuiting And, since hoisting
+    from those would evaluate expressions the original program might
+    never reach (and so could raise where the original would not).
+    """
+    global _hoist_serial
+    body = expression.body
+    written = _assigned_names(body) | _assigned_names(expression.condition)
+
+    temps = []
+    replacements = {}
+    work = [body]
+    while work:
+        node = work.pop()
+        if isinstance(node, _HOISTABLE_TYPES) and _is_pure(node) \
+                and not any(name in written
+                            for name in _free_variables(node)):
+            temp_name = f"__hoist{_hoist_serial}"
+            _hoist_serial += 1
+            temps.append((temp_name, node))
+            replacements[id(node)] = temp_name
+            continue
+        node_type = type(node)
+        if node_type is If:
+            work.append(node.condition)
+        elif node_type is While:
+            pass
+        elif node_type is And:
+            work.append(node.left)
+        else:
+            work.extend(_expression_children(node))
 
-        case While(condition=condition, body=body):
-            # Initialize the result and type for the While loop
-            result, result_type = None, None
+    if not temps:
+        return None
+    return (tuple(temps), _replace_nodes(body, replacements))
+
+
+def _replace_nodes(node, replacements):
+    temp_name = replacements.get(id(node))
+    if temp_name is not None:
+        return Variable(temp_name)
+    node_type = type(node)
+    if node_type is Sequence or node_type is Program:
+        return node_type(*[_replace_nodes(expr, replacements)
+                           for expr in node.exprs])
+    if node_type is Assign:
+        return Assign(node.variable, _replace_nodes(node.value, replacements))
+    if node_type is _FusedAssign:
+        return _FusedAssign(tuple(
+            Assign(assign.variable, _replace_nodes(assign.value, replacements))
+            for assign in node.assigns))
+    if node_type is Print:
+        return Print(_replace_nodes(node.to_print, replacements))
+    if node_type is Not:
+        return Not(_replace_nodes(node.expr, replacements))
+    if node_type is If:
+        return If(_replace_nodes(node.condition, replacements),
+                  _replace_nodes(node.true, replacements),
+                  _replace_nodes(node.false, replacements))
+    if node_type is While:
+        return While(_replace_nodes(node.condition, replacements),
+                     _replace_nodes(node.body, replacements))
+    if isinstance(node, BinaryOperator):
+        return node_type(_replace_nodes(node.left, replacements),
+                         _replace_nodes(node.right, replacements))
+    return node
+
+
+def _evaluate_while(expression, state):
+    condition = expression.condition
+    body = expression.body
+    result, result_type = None, None
+
+    # Teaching programs are overwhelmingly counted loops; lower the
+    # recognized shape to a native range() step so Lt + Add + Assign cost
+    # nothing per iteration. The match is cached on the node (False when
+    # it fails) and only applies when the counter is a bound Integer.
+    spec = getattr(expression, '_counted', None)
+    if spec is None:
+        spec = _counted_loop_spec(expression)
+        expression._counted = spec if spec is not None else False
+    if spec:
+        name, bound, prefix = spec
+        binding = state.get_value(name)
+        if binding is not None and binding[1] is INTEGER:
+            start = binding[0]
+            if start >= bound:
+                return (None, None, state)
+            loop_state = MutableState(dict(state._vars))
+            ev = evaluate
+            for next_value in range(start + 1, bound + 1):
+                for expr in prefix:
+                    _, _, loop_state = ev(expr, loop_state)
+                # A nested While hands back a plain (persistent) State;
+                # re-wrap so the counter update stays in place.
+                if type(loop_state) is not MutableState:
+                    loop_state = MutableState(loop_state._vars)
+                loop_state._vars[name] = (next_value, INTEGER)
+            return (next_value, INTEGER, State(loop_state._vars))
+
+    # A loop that stays on integers and booleans (no strings, floats,
+    # or Print) runs through the bytecode VM's numeric kernel -- compiled
+    # to machine code when numba is installed -- instead of walking the
+    # tree per iteration. The compile happens once and is cached on the
+    # node; the kernel declines (returns None) when the caller's bindings
+    # don't fit it, and the generic loop below takes over.
+    numeric = getattr(expression, '_numeric', None)
+    if numeric is not False:
+        from stimpl.compile import compile_while_numeric, run_while_numeric
+        if numeric is None:
+            numeric = compile_while_numeric(expression)
+            expression._numeric = numeric if numeric is not None else False
+        if numeric:
+            ran = run_while_numeric(numeric, state)
+            if ran is not None:
+                return ran
+
+    # Loop-invariant code motion: pure body subexpressions that read
+    # nothing the loop writes are evaluated once into hidden temps -- only
+    # after the condition first passes, so a loop that never runs never
+    # evaluates them -- and the body reads the temps instead. One caveat,
+    # accepted: if a hoisted expression raises, it does so before the rest
+    # of the first iteration instead of at its original position.
+    hoist = getattr(expression, '_hoisted', None)
+    if hoist is None:
+        hoist = _hoist_invariants(expression)
+        expression._hoisted = hoist if hoist is not None else False
+    if hoist:
+        body = hoist[1]
+    hoisted = not hoist
+
+    # The condition and body AST nodes never change across iterations, so
+    # resolve their handlers once instead of re-dispatching N times.
+    condition_handler = HANDLERS.get(type(condition))
+    body_handler = HANDLERS.get(type(body))
+    if condition_handler is None or body_handler is None:
+        raise InterpSyntaxError("Unhandled!")
+
+    # Assignments dominate loop bodies, and each one would otherwise copy
+    # the whole variable dict. Snapshot the caller's variables once and
+    # mutate that single dict for the duration of the loop.
+    loop_state = MutableState(dict(state._vars))
+
+    while True:
+        condition_value, condition_type, loop_state = condition_handler(
+            condition, loop_state)
+
+        if condition_type is not BOOLEAN:
+            raise InterpTypeError("Condition in While loop must be boolean")
+
+        if not condition_value:
+            break
+
+        if not hoisted:
+            ev = evaluate
+            for temp_name, temp_expr in hoist[0]:
+                temp_value, temp_type, loop_state = ev(temp_expr, loop_state)
+                loop_state._vars[temp_name] = (temp_value, temp_type)
+            hoisted = True
+
+        result, result_type, loop_state = body_handler(body, loop_state)
+
+    variables = loop_state._vars
+    if hoist:
+        # The temps are implementation detail; they never appear in the
+        # state the loop hands back.
+        for temp_name, _ in hoist[0]:
+            variables.pop(temp_name, None)
+
+    return (result, result_type, State(variables))
+
+
+HANDLERS = {
+    Ren: _evaluate_ren,
+    IntLiteral: _evaluate_int_literal,
+    FloatingPointLiteral: _evaluate_floating_point_literal,
+    StringLiteral: _evaluate_string_literal,
+    BooleanLiteral: _evaluate_boolean_literal,
+    Print: _evaluate_print,
+    Sequence: _evaluate_sequence,
+    Program: _evaluate_sequence,
+    Variable: _evaluate_variable,
+    Assign: _evaluate_assign,
+    _FusedAssign: _evaluate_fused_assign,
+    Add: _evaluate_add,
+    Subtract: _evaluate_subtract,
+    Multiply: _evaluate_multiply,
+    Divide: _evaluate_divide,
+    And: _evaluate_and,
+    Or: _evaluate_or,
+    Not: _evaluate_not,
+    If: _evaluate_if,
+    Lt: _evaluate_lt,
+    Lte: _evaluate_lte,
+    Gt: _evaluate_gt,
+    Gte: _evaluate_gte,
+    Eq: _evaluate_eq,
+    Ne: _evaluate_ne,
+    While: _evaluate_while,
+}
 
-            # Evaluate the condition
-            condition_value, condition_type, new_state = evaluate(condition, state)
 
-            # Check if the condition is of boolean type
-            if not isinstance(condition_type, Boolean):
-                raise InterpTypeError("Condition in While loop must be boolean")
+"""
+Pure-expression cache.
+
+An expression is pure when it contains no Assign, Print or While: its value
+depends only on the variables it reads. Re-evaluating such an expression
+against the same bindings (e.g. a While condition's subexpressions, or a
+repeated branch in a deep nest) always produces the same result, so results
+are cached keyed on the node plus a snapshot of its free-variable bindings.
+Literals and bare variable reads are cheaper than a cache probe and are
+never cached.
+"""
+
+_IMPURE_TYPES = (Assign, _FusedAssign, Print, While)
+_CACHEABLE_TYPES = (BinaryOperator, Not, If)
+
+_PURE_CACHE: OrderedDict = OrderedDict()
+_PURE_CACHE_MAX_SIZE = 1024
+_PURE_CACHE_MAX_VARS = 4
+
+
+def _expression_children(expression):
+    if isinstance(expression, BinaryOperator):
+        return (expression.left, expression.right)
+    if isinstance(expression, Not):
+        return (expression.expr,)
+    if isinstance(expression, Print):
+        return (expression.to_print,)
+    if isinstance(expression, Assign):
+        return (expression.variable, expression.value)
+    if isinstance(expression, _FusedAssign):
+        return expression.assigns
+    if isinstance(expression, (Sequence, Program)):
+        return expression.exprs
+    if isinstance(expression, If):
+        return (expression.condition, expression.true, expression.false)
+    if isinstance(expression, While):
+        return (expression.condition, expression.body)
+    return ()
+
+
+def _free_variables(expression):
+    """ The (sorted) names of every variable read anywhere in `expression`.
+
+    Computed once per node and cached on it.
+    """
+    free_vars = getattr(expression, "_free_vars", None)
+    if free_vars is None:
+        if isinstance(expression, Variable):
+            free_vars = (expression.variable_name,)
+        else:
+            names = set()
+            for child in _expression_children(expression):
+                names.update(_free_variables(child))
+            free_vars = tuple(sorted(names))
+        expression._free_vars = free_vars
+    return free_vars
+
+
+def _is_pure(expression):
+    pure = getattr(expression, "_pure", None)
+    if pure is None:
+        if isinstance(expression, _IMPURE_TYPES):
+            pure = False
+        else:
+            pure = all(_is_pure(child)
+                       for child in _expression_children(expression))
+        expression._pure = pure
+    return pure
 
-            # Loop while the condition is True
-            while condition_value:
-                # Evaluate the body of the loop
-                result, result_type, new_state = evaluate(body, new_state)
 
-                # Re-evaluate the condition for the next iteration
-                condition_value, condition_type, new_state = evaluate(condition, new_state)
+def _pure_cache_key(expression, state):
+    free_vars = _free_variables(expression)
+    if len(free_vars) > _PURE_CACHE_MAX_VARS:
+        # Snapshotting a wide read set per visit costs more than the
+        # evaluation it would save; leave such nodes uncached.
+        return None
+    bindings = []
+    for variable_name in free_vars:
+        bound = state.get_value(variable_name)
+        if bound is None:
+            # Evaluation is about to raise anyway; don't cache.
+            return None
+        # Types are unhashable (they define __eq__), but they are
+        # singletons, so the class stands in for the instance.
+        bindings.append((bound[0], bound[1].__class__))
+    return (expression, tuple(bindings))
 
-            return (result, result_type, new_state)
 
-        case _:
-            raise InterpSyntaxError("Unhandled!")
-    pass
+# One probe per evaluation: the dispatch table pairs each handler with a
+# precomputed "is this node type worth probing the pure cache for" flag,
+# so evaluate does no isinstance work of its own.
+_DISPATCH = {
+    node_type: (handler, issubclass(node_type, _CACHEABLE_TYPES))
+    for node_type, handler in HANDLERS.items()
+}
 
 
-def run_stimpl(program, debug=False):
-    state = EmptyState()
-    program_value, program_type, program_state = evaluate(program, state)
+def evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State]:
+    dispatch = _DISPATCH.get(type(expression))
+    if dispatch is None:
+        raise InterpSyntaxError("Unhandled!")
+    handler, cacheable = dispatch
+
+    if cacheable and _is_pure(expression):
+        key = _pure_cache_key(expression, state)
+        if key is not None:
+            cached = _PURE_CACHE.get(key)
+            if cached is not None:
+                _PURE_CACHE.move_to_end(key)
+                return (cached[0], cached[1], state)
+            value, value_type, new_state = handler(expression, state)
+            _PURE_CACHE[key] = (value, value_type)
+            if len(_PURE_CACHE) > _PURE_CACHE_MAX_SIZE:
+                _PURE_CACHE.popitem(last=False)
+            return (value, value_type, new_state)
+
+    return handler(expression, state)
+
+
+def _fold_constant(candidate):
+    """ Evaluate a pure all-constant node now; if it would raise, keep the
+    node so the error still happens at run time (and only if the node is
+    actually reached). TypeError is kept alongside InterpError because the
+    unchecked comparisons (Lte/Gt/Gte) let mixed-type operands reach the
+    raw Python operator. """
+    try:
+        value, value_type, _ = evaluate(candidate, State())
+    except (InterpError, TypeError):
+        return candidate
+    if value_type is INTEGER:
+        return IntLiteral(value)
+    if value_type is FLOATING_POINT:
+        return FloatingPointLiteral(value)
+    if value_type is STRING:
+        return StringLiteral(value)
+    if value_type is BOOLEAN:
+        return BooleanLiteral(value)
+    return candidate
+
+
+def _is_constant(expression):
+    return isinstance(expression, (Literal, Ren))
+
+
+def fold(expression):
+    """ Constant-fold literal subtrees, returning a (possibly) new tree.
+
+    Operator nodes whose operands fold to literals are computed once here
+    instead of on every visit -- which matters most inside While bodies --
+    and an If with a literal condition keeps only the taken branch. Runs
+    on an explicit stack (visit, then rebuild once the children are done)
+    so arbitrarily deep trees never hit Python's recursion limit.
+    """
+    work = [(expression, False)]
+    results = []
+    while work:
+        node, ready = work.pop()
+        node_type = type(node)
+        if not ready:
+            if node_type is Sequence or node_type is Program:
+                work.append((node, True))
+                for expr in reversed(node.exprs):
+                    work.append((expr, False))
+            elif node_type is Assign:
+                work.append((node, True))
+                work.append((node.value, False))
+            elif node_type is Print:
+                work.append((node, True))
+                work.append((node.to_print, False))
+            elif node_type is If:
+                work.append((node, True))
+                work.append((node.false, False))
+                work.append((node.true, False))
+                work.append((node.condition, False))
+            elif node_type is While:
+                work.append((node, True))
+                work.append((node.body, False))
+                work.append((node.condition, False))
+            elif node_type is Not:
+                work.append((node, True))
+                work.append((node.expr, False))
+            elif isinstance(node, BinaryOperator):
+                work.append((node, True))
+                work.append((node.right, False))
+                work.append((node.left, False))
+            else:
+                results.append(node)
+        elif node_type is Sequence or node_type is Program:
+            count = len(node.exprs)
+            children = results[len(results) - count:]
+            del results[len(results) - count:]
+            results.append(node_type(*children))
+        elif node_type is Assign:
+            results.append(Assign(node.variable, results.pop()))
+        elif node_type is Print:
+            results.append(Print(results.pop()))
+        elif node_type is If:
+            false = results.pop()
+            true = results.pop()
+            condition = results.pop()
+            if type(condition) is BooleanLiteral:
+                results.append(true if condition.literal else false)
+            else:
+                results.append(If(condition, true, false))
+        elif node_type is While:
+            body = results.pop()
+            condition = results.pop()
+            results.append(While(condition, body))
+        elif node_type is Not:
+            operand = results.pop()
+            candidate = Not(operand)
+            results.append(_fold_constant(candidate)
+                           if _is_constant(operand) else candidate)
+        else:
+            right = results.pop()
+            left = results.pop()
+            candidate = node_type(left, right)
+            if _is_constant(left) and _is_constant(right):
+                results.append(_fold_constant(candidate))
+            else:
+                results.append(candidate)
+    return results[0]
+
+
+def _fuse_runs(exprs):
+    fused = []
+    run = []
+    for expr in exprs:
+        if type(expr) is Assign and _is_pure(expr.value):
+            run.append(expr)
+            continue
+        if len(run) >= 2:
+            fused.append(_FusedAssign(tuple(run)))
+        else:
+            fused.extend(run)
+        run = []
+        fused.append(expr)
+    if len(run) >= 2:
+        fused.append(_FusedAssign(tuple(run)))
+    else:
+        fused.extend(run)
+    return fused
+
+
+def _fuse_assigns(expression):
+    """ Coalesce consecutive pure-valued Assigns inside Sequence/Program
+    bodies into _FusedAssign nodes. Counted loops are left alone: fusing
+    a loop body's tail would hide the increment from the counted-loop
+    match, which is the better optimization. """
+    work = [(expression, False)]
+    results = []
+    while work:
+        node, ready = work.pop()
+        node_type = type(node)
+        if not ready:
+            if node_type is Sequence or node_type is Program:
+                work.append((node, True))
+                for expr in reversed(node.exprs):
+                    work.append((expr, False))
+            elif node_type is Assign:
+                work.append((node, True))
+                work.append((node.value, False))
+            elif node_type is Print:
+                work.append((node, True))
+                work.append((node.to_print, False))
+            elif node_type is Not:
+                work.append((node, True))
+                work.append((node.expr, False))
+            elif node_type is If:
+                work.append((node, True))
+                work.append((node.false, False))
+                work.append((node.true, False))
+                work.append((node.condition, False))
+            elif node_type is While:
+                work.append((node, True))
+                work.append((node.body, False))
+                work.append((node.condition, False))
+            elif isinstance(node, BinaryOperator):
+                work.append((node, True))
+                work.append((node.right, False))
+                work.append((node.left, False))
+            else:
+                results.append(node)
+        elif node_type is Sequence or node_type is Program:
+            count = len(node.exprs)
+            children = results[len(results) - count:]
+            del results[len(results) - count:]
+            results.append(node_type(*_fuse_runs(children)))
+        elif node_type is Assign:
+            results.append(Assign(node.variable, results.pop()))
+        elif node_type is Print:
+            results.append(Print(results.pop()))
+        elif node_type is Not:
+            results.append(Not(results.pop()))
+        elif node_type is If:
+            false = results.pop()
+            true = results.pop()
+            condition = results.pop()
+            results.append(If(condition, true, false))
+        elif node_type is While:
+            body = results.pop()
+            condition = results.pop()
+            if _counted_loop_spec(node) is not None:
+                results.append(While(condition, node.body))
+            else:
+                results.append(While(condition, body))
+        else:
+            right = results.pop()
+            left = results.pop()
+            results.append(node_type(left, right))
+    return results[0]
+
+
+def run_stimpl(program, debug=False, engine="ast"):
+    program = fold(program)
+
+    if engine == "bytecode":
+        # The compiled engine runs on an explicit operand stack, so tree
+        # depth never touches Python's recursion limit. Imported lazily:
+        # stimpl.compile imports this module.
+        from stimpl.compile import compile_to_bytecode, run_bytecode
+        program_value, program_type, program_state = run_bytecode(
+            compile_to_bytecode(program))
+    elif engine == "closure":
+        # Walks the AST once, then runs plain closure calls with no
+        # per-visit dispatch. Lazy import for the same reason as above.
+        from stimpl.closures import compile_to_closure
+        program_value, program_type, program_state = compile_to_closure(
+            program)(EmptyState())
+    else:
+        program = _fuse_assigns(program)
+        state = EmptyState()
+        program_value, program_type, program_state = evaluate(program, state)
 
     if debug:
         print(f"program: {program}")
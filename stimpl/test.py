@@ -23,9 +23,9 @@ def check_equal(expected, actual):
         raise TestingError(expected, actual)
 
 
-def check_program_raises(raise_type, program):
+def check_program_raises(raise_type, program, engine="ast"):
     try:
-        run_stimpl(program)
+        run_stimpl(program, engine=engine)
     except Exception as e:
         # This is supposed to raise something
         # with the same type as `raise_type`.
@@ -47,7 +47,18 @@ def check_run_result(expected, actual):
                            (actual_value, actual_type))
 
 
-def run_stimpl_sanity_tests():
+def run_stimpl_sanity_tests(engine="ast"):
+    # The same suite doubles as an engine-parity check: the shims below
+    # shadow the module-level helpers so every program in the body runs
+    # through the requested engine.
+    import stimpl.test as _test
+
+    def run_stimpl(program, debug=False):
+        return _test.run_stimpl(program, debug, engine=engine)
+
+    def check_program_raises(raise_type, program):
+        _test.check_program_raises(raise_type, program, engine)
+
     try:
         # Mathematical Expressions (5 pts)
         program = Add(IntLiteral(10), IntLiteral(10))
@@ -458,3 +469,96 @@ def run_stimpl_sanity_tests():
         raise e
 
     print("All (sanity) tests ran successfully!")
+
+
+_ENGINES = ("ast", "bytecode", "closure")
+
+
+def run_stimpl_regression_tests():
+    """ Pinned behaviors for bugs found in the optimization passes and
+    alternate engines; every case runs on all three engines. """
+    try:
+        # A never-taken If arm must stay unevaluated, even when the loop
+        # optimizer hoists invariants out of the body.
+        program = Program(
+            Assign(Variable("f"), FloatingPointLiteral(3.0)),
+            While(Gt(Variable("f"), FloatingPointLiteral(0.0)), Sequence(
+                If(BooleanLiteral(True),
+                   Assign(Variable("f"),
+                          Subtract(Variable("f"), FloatingPointLiteral(1.0))),
+                   Add(Variable("never_bound"), FloatingPointLiteral(1.0))))))
+        for engine in _ENGINES:
+            run_value, run_type, run_state = run_stimpl(program, engine=engine)
+            check_equal((0.0, FloatingPoint()), run_state.get_value("f"))
+
+        # Constant folding must keep nodes whose evaluation would raise a
+        # raw TypeError (an unchecked mixed-type comparison) in dead code.
+        program = Program(If(BooleanLiteral(False),
+                             Lte(StringLiteral("x"), IntLiteral(1)),
+                             IntLiteral(0)))
+        for engine in _ENGINES:
+            check_run_result((0, Integer(), None),
+                             run_stimpl(program, engine=engine))
+
+        # A variable holding a never-run While result (declared type None)
+        # is free to take any type on every engine ...
+        def never_run_while():
+            return While(BooleanLiteral(False), IntLiteral(1))
+
+        program = Program(Assign(Variable("x"), never_run_while()),
+                          Assign(Variable("x"), IntLiteral(5)))
+        for engine in _ENGINES:
+            check_run_result((5, Integer(), None),
+                             run_stimpl(program, engine=engine))
+
+        # ... including when the store happens inside a numeric loop.
+        program = Program(
+            Assign(Variable("i"), IntLiteral(1)),
+            While(Gt(Variable("i"), IntLiteral(0)), Sequence(
+                Assign(Variable("x"), never_run_while()),
+                Assign(Variable("x"), IntLiteral(5)),
+                Assign(Variable("i"),
+                       Subtract(Variable("i"), IntLiteral(1))))))
+        for engine in _ENGINES:
+            run_value, run_type, run_state = run_stimpl(program, engine=engine)
+            check_equal((5, Integer()), run_state.get_value("x"))
+
+        # ... but overwriting a concretely typed binding with one still
+        # mismatches, and < on None types raises, as in the tree walker.
+        program = Program(Assign(Variable("x"), IntLiteral(1)),
+                          Assign(Variable("x"), never_run_while()))
+        for engine in _ENGINES:
+            check_program_raises(InterpTypeError(), program, engine)
+
+        program = Program(Assign(Variable("x"), never_run_while()),
+                          Assign(Variable("y"), never_run_while()),
+                          Lt(Variable("x"), Variable("y")))
+        for engine in _ENGINES:
+            check_program_raises(InterpTypeError(), program, engine)
+
+        # Integer arithmetic is exact however the loop executes:
+        # factorial(25) overflows int64 many times over.
+        factorial_25 = 15511210043330985984000000
+        program = Program(
+            Assign(Variable("n"), IntLiteral(25)),
+            Assign(Variable("f"), IntLiteral(1)),
+            While(Gt(Variable("n"), IntLiteral(1)), Sequence(
+                Assign(Variable("f"),
+                       Multiply(Variable("f"), Variable("n"))),
+                Assign(Variable("n"),
+                       Subtract(Variable("n"), IntLiteral(1))))))
+        for engine in _ENGINES:
+            run_value, run_type, run_state = run_stimpl(program, engine=engine)
+            check_equal((factorial_25, Integer()), run_state.get_value("f"))
+
+        # An empty Sequence keeps its (None, Unit) value when it is the
+        # last element of a program.
+        program = Program(Assign(Variable("x"), IntLiteral(1)), Sequence())
+        for engine in _ENGINES:
+            check_run_result((None, Unit(), None),
+                             run_stimpl(program, engine=engine))
+
+    except Exception as e:
+        raise e
+
+    print("All (regression) tests ran successfully!")
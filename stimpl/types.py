@@ -4,6 +4,22 @@ Types
 
 
 class Type(object):
+    # Capability flags resolved with one attribute load on the singleton,
+    # where handlers would otherwise walk an isinstance tuple per operand.
+    IS_NUMERIC = False
+    IS_ADDABLE = False
+    IS_ORDERED = False
+
+    def __new__(cls):
+        # Each type is a singleton: constructing, say, Integer() anywhere
+        # always yields the same instance, so type comparisons can be done
+        # with `is` and repeated construction costs no allocation.
+        instance = cls.__dict__.get("_instance")
+        if instance is None:
+            instance = super().__new__(cls)
+            cls._instance = instance
+        return instance
+
     def __init__(self):
         pass
 
@@ -24,6 +40,10 @@ class Unit(Type):
 
 
 class Integer(Type):
+    IS_NUMERIC = True
+    IS_ADDABLE = True
+    IS_ORDERED = True
+
     def __init__(self):
         pass
 
@@ -39,6 +59,10 @@ class Integer(Type):
 
 
 class FloatingPoint(Type):
+    IS_NUMERIC = True
+    IS_ADDABLE = True
+    IS_ORDERED = True
+
     def __init__(self):
         pass
 
@@ -54,6 +78,9 @@ class FloatingPoint(Type):
 
 
 class String(Type):
+    IS_ADDABLE = True
+    IS_ORDERED = True
+
     def __init__(self):
         pass
 
@@ -69,6 +96,8 @@ class String(Type):
 
 
 class Boolean(Type):
+    IS_ORDERED = True
+
     def __init__(self):
         pass
 
@@ -81,3 +110,10 @@ class Boolean(Type):
                 return True
             case _:
                 return False
+
+
+UNIT = Unit()
+INTEGER = Integer()
+FLOATING_POINT = FloatingPoint()
+STRING = String()
+BOOLEAN = Boolean()
@@ -1,9 +1,12 @@
 from stimpl.expression import BooleanLiteral
 from stimpl.robustness import run_stimpl_robustness_tests
-from stimpl.test import run_stimpl_sanity_tests
+from stimpl.test import run_stimpl_sanity_tests, run_stimpl_regression_tests
 from stimpl.test_state import test_state_implementation
 
 if __name__=='__main__':
   test_state_implementation()
   run_stimpl_sanity_tests()
-  run_stimpl_robustness_tests()
\ No newline at end of file
+  run_stimpl_sanity_tests(engine="bytecode")
+  run_stimpl_sanity_tests(engine="closure")
+  run_stimpl_robustness_tests()
+  run_stimpl_regression_tests()
\ No newline at end of file